@@ -0,0 +1,140 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+import pika
+from django.conf import settings
+
+logger = logging.getLogger("auth_events")
+
+
+class UserEventPublisher:
+    """
+    Publishes user events from one long-lived connection per process.
+
+    publish() only puts the event on a bounded in-memory queue, so the
+    request that saved the user never waits for the broker. A background
+    thread owns the connection (pika is not thread-safe), sends the queued
+    events in order and services heartbeats while idle. While the broker
+    is down events wait in the queue and the thread reconnects with
+    backoff; once the queue is full further events are logged and dropped.
+
+    The thread is started on first use and again after a fork, so web
+    workers forked from a preloaded master each get their own.
+    """
+
+    def __init__(self, connection_params, exchange, max_pending=1000,
+                 reconnect_delay=1, max_reconnect_delay=30, idle_interval=5):
+        self.connection_params = connection_params
+        self.exchange = exchange
+        self.max_pending = max_pending
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.idle_interval = idle_interval
+
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._pid != os.getpid():
+                # A forked child inherits neither the thread nor the socket.
+                self._pid = os.getpid()
+                self._queue = queue.Queue(maxsize=self.max_pending)
+                self._thread = None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    args=(self._queue,),
+                    name="user-events",
+                    daemon=True,
+                )
+                self._thread.start()
+            return self._queue
+
+    def publish(self, event, user_id, **data):
+        body = json.dumps({"event": event, "user_id": user_id, **data})
+        try:
+            self._ensure_started().put_nowait(body)
+        except queue.Full:
+            logger.error(f"User event queue full, dropped {event} for user {user_id}")
+
+    # ---------- publisher thread ----------
+
+    def _connect(self):
+        connection = pika.BlockingConnection(self.connection_params)
+        channel = connection.channel()
+        channel.exchange_declare(exchange=self.exchange, exchange_type="fanout", durable=True)
+        return connection, channel
+
+    def _run(self, events):
+        connection = channel = None
+        body = None
+        backoff = self.reconnect_delay
+
+        while True:
+            try:
+                if connection is None or not connection.is_open:
+                    connection, channel = self._connect()
+                    backoff = self.reconnect_delay
+
+                if body is None:
+                    try:
+                        body = events.get(timeout=self.idle_interval)
+                    except queue.Empty:
+                        connection.process_data_events(time_limit=0)
+                        continue
+
+                channel.basic_publish(
+                    exchange=self.exchange,
+                    routing_key="",
+                    properties=pika.BasicProperties(content_type="application/json"),
+                    body=body,
+                )
+                body = None
+            except Exception as e:
+                # Keep the event in hand and send it on the next connection.
+                logger.error(f"User event publisher lost its connection: {e}")
+                if connection is not None and connection.is_open:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+                connection = channel = None
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_reconnect_delay)
+
+
+publisher = UserEventPublisher(
+    pika.ConnectionParameters(
+        host=settings.RABBITMQ_HOST,
+        port=settings.RABBITMQ_PORT,
+        virtual_host=settings.RABBITMQ_VHOST,
+        credentials=pika.PlainCredentials(
+            settings.RABBITMQ_USER,
+            settings.RABBITMQ_PASS,
+        ),
+    ),
+    settings.AUTH_USER_EVENTS_EXCHANGE,
+    max_pending=settings.AUTH_USER_EVENTS_MAX_PENDING,
+)
+
+
+def publish_user_event(event, user_id, **data):
+    """
+    Broadcast a user change on the user events fanout exchange; extra
+    keyword arguments are sent along in the event body.
+
+    The auth RPC workers listen on it to drop cached validations for the
+    user, and team_service to refresh the profile copies on its members.
+    The event is handed to the process's publisher and sent in the
+    background; it never raises. A missed event only means a cached entry
+    lives until its TTL runs out, or a roster shows the old name until
+    the user's next profile change.
+    """
+    publisher.publish(event, user_id, **data)
@@ -0,0 +1,412 @@
+"""
+Shared runtime for the RabbitMQ RPC servers.
+
+A server registers one handler per action and listens on one or more
+queues. The runtime owns everything else: the connection and reconnect
+backoff, prefetch, a thread pool that runs handlers concurrently (each
+thread keeps its own Django DB connection), close_old_connections
+hygiene, graceful drain on SIGTERM and per-action latency metrics.
+
+    server = RPCServer("team_rpc", workers=8)
+    server.listen(settings.TEAM_RPC_QUEUE)
+
+    @server.action("get_membership")
+    def get_membership(payload):
+        return {"ok": True, ...}
+
+    server.run()
+
+Handlers take the decoded payload and return the response dict. Payloads
+without an "action" key go to the handler registered with @server.default.
+Requests are decoded according to their content_type and answered in the
+same codec, falling back to JSON (see rpc_codec). Requests whose caller
+deadline has already passed are acked and dropped without running the
+handler; the number skipped is part of every metrics report.
+
+The broker connection comes from `connect`, a callable returning a
+pika.BlockingConnection or anything with the same interface (such as the
+in-memory broker in benchmarks/memory_broker.py).
+"""
+import functools
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pika
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from . import rpc_codec
+
+logger = logging.getLogger("rpc_runtime")
+
+# Absolute deadline (epoch seconds) set by rpc_client on every request.
+DEADLINE_HEADER = "x-deadline"
+
+
+def connect_from_settings():
+    return pika.BlockingConnection(
+        pika.ConnectionParameters(
+            host=settings.RABBITMQ_HOST,
+            port=settings.RABBITMQ_PORT,
+            virtual_host=settings.RABBITMQ_VHOST,
+            credentials=pika.PlainCredentials(
+                settings.RABBITMQ_USER,
+                settings.RABBITMQ_PASS,
+            ),
+            heartbeat=60,
+            blocked_connection_timeout=30,
+        )
+    )
+
+
+class ActionMetrics:
+    """Latency samples per action, pool busy time and expired requests, reset every report."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.expired_total = 0
+        self.reset()
+
+    def reset(self):
+        self.window_start = time.monotonic()
+        self.samples = {}
+        self.busy = 0.0
+        self.expired = 0
+
+    def record(self, action, duration):
+        with self._lock:
+            self.samples.setdefault(action, []).append(duration)
+            self.busy += duration
+
+    def record_expired(self):
+        with self._lock:
+            self.expired += 1
+            self.expired_total += 1
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = time.monotonic() - self.window_start
+            actions = {}
+
+            for action, samples in self.samples.items():
+                samples = sorted(samples)
+                actions[action] = {
+                    "count": len(samples),
+                    "avg_ms": sum(samples) / len(samples) * 1000,
+                    "p50_ms": samples[len(samples) // 2] * 1000,
+                    "p99_ms": samples[min(int(len(samples) * 0.99), len(samples) - 1)] * 1000,
+                    "max_ms": samples[-1] * 1000,
+                }
+
+            return {
+                "elapsed": elapsed,
+                "busy": self.busy,
+                "expired": self.expired,
+                "expired_total": self.expired_total,
+                "actions": actions,
+            }
+
+
+class RPCServer:
+    def __init__(self, name, workers=4, prefetch=None, report_interval=60,
+                 connect=connect_from_settings):
+        self.name = name
+        self.connect = connect
+        self.workers = workers
+        self.prefetch = prefetch or workers * 2
+        self.report_interval = report_interval
+
+        self.queues = []
+        self.handlers = {}
+        self.default_handler = None
+        self.connect_hooks = []
+        self.reporters = []
+
+        self.metrics = ActionMetrics()
+        self.connection = None
+        self.channel = None
+
+        self._draining = False
+        self._in_flight = {}  # connection -> deliveries taken but not yet answered
+        self._in_flight_lock = threading.Lock()
+
+    # ---------- registration ----------
+
+    def listen(self, queue):
+        self.queues.append(queue)
+
+    def action(self, name):
+        def register(handler):
+            self.handlers[name] = handler
+            return handler
+        return register
+
+    def default(self, handler):
+        self.default_handler = handler
+        return handler
+
+    def on_connect(self, hook):
+        """
+        Run hook(channel) after every (re)connect, e.g. to bind extra queues.
+
+        A hook that starts consumers returns their tag (or a list of tags)
+        so a drain cancels them along with the server's own.
+        """
+        self.connect_hooks.append(hook)
+        return hook
+
+    def reporter(self, hook):
+        """Run hook() with every metrics report to log extra stats."""
+        self.reporters.append(hook)
+        return hook
+
+    # ---------- message handling ----------
+
+    def dispatch(self, payload):
+        action = payload.get("action")
+        handler = self.handlers.get(action) if action else self.default_handler
+
+        if handler is None:
+            return "unknown", {"ok": False, "error": "unknown_action"}
+
+        try:
+            return action, handler(payload)
+        except Exception as e:
+            logger.exception(f"{self.name}: {action or 'default'} failed")
+            return action, {"ok": False, "error": str(e)}
+
+    def _expired(self, props):
+        deadline = (props.headers or {}).get(DEADLINE_HEADER)
+        if not isinstance(deadline, (int, float)) or deadline > time.time():
+            return False
+
+        self.metrics.record_expired()
+        return True
+
+    def _on_message(self, ch, method, props, body):
+        # The caller has given up; don't queue work nobody will read.
+        if self._expired(props):
+            ch.basic_ack(method.delivery_tag)
+            return
+
+        with self._in_flight_lock:
+            self._in_flight[ch.connection] = self._in_flight.get(ch.connection, 0) + 1
+        self.executor.submit(self._handle, ch, method, props, body)
+
+    def _handle(self, ch, method, props, body):
+        # It may have expired while waiting for a free worker; ack it unanswered.
+        response = None if self._expired(props) else self._process(props, body)
+
+        try:
+            # Replies go out on the connection that delivered the message.
+            ch.connection.add_callback_threadsafe(
+                functools.partial(self._reply, ch, method.delivery_tag, props, response)
+            )
+        except Exception as e:
+            # The broker redelivers the unacked message after a reconnect.
+            logger.error(f"{self.name}: could not queue reply: {e}")
+            self._done(ch.connection)
+
+    def _process(self, props, body):
+        started = time.monotonic()
+        close_old_connections()
+
+        try:
+            payload = rpc_codec.decode(body, props.content_type)
+        except Exception:
+            action, response = "invalid", {"ok": False, "error": "invalid_payload"}
+        else:
+            action, response = self.dispatch(payload)
+        finally:
+            close_old_connections()
+
+        self.metrics.record(action or "default", time.monotonic() - started)
+        return response
+
+    def _reply(self, ch, delivery_tag, props, response):
+        try:
+            if props.reply_to and response is not None:
+                content_type = rpc_codec.negotiate(props.content_type)
+                ch.basic_publish(
+                    exchange="",
+                    routing_key=props.reply_to,
+                    properties=pika.BasicProperties(
+                        correlation_id=props.correlation_id,
+                        content_type=content_type,
+                    ),
+                    body=rpc_codec.encode(response, content_type),
+                )
+            ch.basic_ack(delivery_tag)
+        except Exception as e:
+            logger.error(f"{self.name}: could not send reply: {e}")
+        finally:
+            self._done(ch.connection)
+
+    def _done(self, connection):
+        with self._in_flight_lock:
+            # Work from a connection that is already gone isn't counted.
+            if connection in self._in_flight:
+                self._in_flight[connection] -= 1
+
+    # ---------- connection loop ----------
+
+    def _connect(self):
+        # Replies queued on the old connection will never run, and the
+        # broker redelivers what it left unacked, so stop waiting for it.
+        with self._in_flight_lock:
+            self._in_flight = {}
+
+        self.connection = self.connect()
+        self.channel = self.connection.channel()
+        self.channel.basic_qos(prefetch_count=self.prefetch)
+
+        consumer_tags = []
+        for queue in self.queues:
+            self.channel.queue_declare(queue=queue, durable=True)
+            consumer_tags.append(
+                self.channel.basic_consume(queue=queue, on_message_callback=self._on_message)
+            )
+
+        for hook in self.connect_hooks:
+            tags = hook(self.channel)
+            if isinstance(tags, str):
+                consumer_tags.append(tags)
+            elif tags:
+                consumer_tags.extend(tags)
+
+        return consumer_tags
+
+    def _consume(self):
+        consumer_tags = self._connect()
+        logger.info(
+            f"{self.name} listening on {', '.join(self.queues)} "
+            f"(workers={self.workers}, prefetch={self.prefetch})"
+        )
+        last_report = time.monotonic()
+
+        while True:
+            self.connection.process_data_events(time_limit=1)
+
+            if self._draining:
+                # Stop new deliveries, finish and ack what we already have.
+                for tag in consumer_tags:
+                    self.channel.basic_cancel(tag)
+                consumer_tags = []
+
+                with self._in_flight_lock:
+                    if not self._in_flight.get(self.connection):
+                        break
+
+            if self.report_interval and time.monotonic() - last_report >= self.report_interval:
+                self.report()
+                last_report = time.monotonic()
+
+        self.connection.close()
+
+    def report(self):
+        snapshot = self.metrics.snapshot()
+        self.metrics.reset()
+
+        capacity = snapshot["elapsed"] * self.workers
+        utilization = snapshot["busy"] / capacity * 100 if capacity else 0
+        logger.info(
+            f"{self.name} utilization={utilization:.1f}% "
+            f"expired={snapshot['expired']} expired_total={snapshot['expired_total']}"
+        )
+
+        for action, stats in sorted(snapshot["actions"].items()):
+            logger.info(
+                f"{self.name} action={action} count={stats['count']} "
+                f"avg={stats['avg_ms']:.2f}ms p50={stats['p50_ms']:.2f}ms "
+                f"p99={stats['p99_ms']:.2f}ms max={stats['max_ms']:.2f}ms"
+            )
+
+        for hook in self.reporters:
+            hook()
+
+    def _drain(self, signum, frame):
+        self.stop()
+
+    def stop(self):
+        """Finish in-flight requests and return from serve()."""
+        logger.info(f"{self.name} draining...")
+        self._draining = True
+
+    def serve(self, handle_signals=True):
+        """Consume until SIGTERM/SIGINT (or stop()), reconnecting on errors."""
+        if handle_signals:
+            signal.signal(signal.SIGTERM, self._drain)
+            signal.signal(signal.SIGINT, self._drain)
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix=self.name,
+        )
+        backoff = 1
+
+        try:
+            while not self._draining:
+                try:
+                    self._consume()
+                    backoff = 1
+                except Exception as e:
+                    if self._draining:
+                        break
+                    logger.error(f"{self.name} error: {e}. Retrying in {backoff}s...")
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, 30)
+        finally:
+            self.executor.shutdown(wait=True)
+            logger.info(f"{self.name} stopped")
+
+    def run(self, processes=1):
+        """Serve with `processes` forked consumers, restarting any that die."""
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+        if processes <= 1:
+            self.serve()
+            return
+
+        # Each child opens its own DB and broker connections after the fork.
+        connections.close_all()
+
+        children = {}
+        stopping = False
+
+        def spawn(index):
+            process = multiprocessing.Process(
+                target=self.serve,
+                name=f"{self.name}-{index}",
+            )
+            process.start()
+            children[index] = process
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+            for process in children.values():
+                if process.is_alive():
+                    process.terminate()
+
+        for index in range(processes):
+            spawn(index)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        logger.info(f"{self.name} started {processes} processes")
+
+        while not stopping:
+            time.sleep(1)
+            for index, process in list(children.items()):
+                if not process.is_alive() and not stopping:
+                    logger.error(
+                        f"{self.name} process {index} exited with {process.exitcode}. Restarting..."
+                    )
+                    spawn(index)
+
+        for process in children.values():
+            process.join()
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from .events import publish_user_event
+from .utils import revoke_user_tokens
+
+User = get_user_model()
+
+# What the auth RPC token cache returns and the profile team_service copies.
+# Changes to anything else (last_login, password, ...) publish no event.
+PUBLISHED_FIELDS = ("email", "full_name", "email_verified", "is_active", "avatar")
+
+
+def published_state(instance):
+    # Read from __dict__ so deferred fields are not loaded just for this.
+    state = {}
+    for name in PUBLISHED_FIELDS:
+        value = instance.__dict__.get(name)
+        state[name] = str(value or "") if name == "avatar" else value
+    return state
+
+
+@receiver(post_init, sender=User)
+def user_loaded(sender, instance, **kwargs):
+    instance._published_state = published_state(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        instance._published_state = published_state(instance)
+        return
+
+    user_id = instance.id
+    if not instance.is_active:
+        revoke_user_tokens(user_id)
+
+    if update_fields is not None and not set(update_fields) & set(PUBLISHED_FIELDS):
+        return
+    state = published_state(instance)
+    if state == getattr(instance, "_published_state", None):
+        return
+    instance._published_state = state
+
+    # Services keeping a copy of the profile apply the newest
+    # updated_at they have seen, so a late event can't roll them back.
+    profile = {
+        "full_name": instance.full_name,
+        "email": instance.email,
+        "avatar_url": instance.avatar.url if instance.avatar else "",
+    }
+    updated_at = instance.updated_at.timestamp()
+    transaction.on_commit(
+        lambda: publish_user_event(
+            "user_updated",
+            user_id,
+            profile=profile,
+            updated_at=updated_at,
+        )
+    )
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    user_id = instance.id
+    revoke_user_tokens(user_id)
+    transaction.on_commit(lambda: publish_user_event("user_deleted", user_id))
@@ -0,0 +1,117 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenCache:
+    """
+    Bounded LRU of validated access tokens for the auth RPC server.
+
+    Entries are keyed by a hash of the raw token, so a hit skips both the
+    signature check and the user lookup. An entry never outlives the
+    token's own expiry, and every entry for a user can be dropped at once
+    when that user changes.
+
+    Evictions race with validations running on other threads: a handler
+    may load the user just before a change is committed and store its
+    result just after the eviction for it. So callers read generation()
+    before loading the user and hand it to set(), which drops the write
+    if the user was evicted (or the cache cleared) in between.
+    """
+
+    def __init__(self, max_size=10000, max_ttl=300):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, user_id, result)
+        self._by_user = {}             # user_id -> set of keys
+        self._generations = {}         # user_id -> evictions so far
+        self._epoch = 0                # clears so far
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token):
+        key = self.key_for(token)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, user_id, result = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def generation(self, user_id):
+        """Opaque marker that changes whenever the user's entries are dropped."""
+        with self._lock:
+            return self._epoch, self._generations.get(int(user_id), 0)
+
+    def set(self, token, exp, user_id, result, generation):
+        expires_at = min(exp, time.time() + self.max_ttl)
+        if expires_at <= time.time():
+            return
+
+        key = self.key_for(token)
+
+        with self._lock:
+            if (self._epoch, self._generations.get(user_id, 0)) != generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (expires_at, user_id, result)
+            self._by_user.setdefault(user_id, set()).add(key)
+
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def evict_user(self, user_id):
+        user_id = int(user_id)
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for key in self._by_user.pop(user_id, set()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._generations.clear()
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _remove(self, key):
+        _, user_id, _ = self._entries.pop(key)
+        keys = self._by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_id]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -1,8 +1,10 @@
 import redis
+import time
 from django.conf import settings
 import random
 import string
 from django.core.mail import send_mail
+from rest_framework_simplejwt.tokens import RefreshToken
 
 
 redis_client = redis.StrictRedis.from_url(settings.REDIS_URL, decode_responses=True)
@@ -10,6 +12,8 @@ redis_client = redis.StrictRedis.from_url(settings.REDIS_URL, decode_responses=T
 OTP_PREFIX = "otp:"
 OTP_TTL = 600 
 
+REVOCATIONS_KEY = "auth:revocations"
+
 
 def generate_otp():
     return ''.join(random.choices(string.digits, k=6))
@@ -29,3 +33,32 @@ def delete_otp(email):
 
 def send_email_sync(subject, message, recipient):
     send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [recipient])
+
+
+def tokens_for_user(user):
+    refresh = RefreshToken.for_user(user)
+
+    # Copied into the access token so other services can verify it locally.
+    refresh["email"] = user.email
+    refresh["full_name"] = user.full_name
+    refresh["email_verified"] = user.email_verified
+
+    return {
+        "access": str(refresh.access_token),
+        "refresh": str(refresh),
+    }
+
+
+def revoke_user_tokens(user_id):
+    redis_client.zadd(REVOCATIONS_KEY, {str(user_id): time.time()})
+
+
+def get_revocations():
+    # Older entries only cover tokens that have expired anyway.
+    lifetime = settings.SIMPLE_JWT["ACCESS_TOKEN_LIFETIME"].total_seconds()
+    redis_client.zremrangebyscore(REVOCATIONS_KEY, "-inf", time.time() - lifetime)
+
+    return {
+        user_id: revoked_at
+        for user_id, revoked_at in redis_client.zrange(REVOCATIONS_KEY, 0, -1, withscores=True)
+    }
@@ -3,7 +3,6 @@ from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions, status
-from rest_framework_simplejwt.tokens import RefreshToken
 import requests
 
 from google.oauth2 import id_token
@@ -23,6 +22,7 @@ from .utils import (
     save_otp_to_redis,
     get_otp_from_redis,
     delete_otp,
+    tokens_for_user,
 )
 from .tasks import send_email_async
 
@@ -107,12 +107,7 @@ class LoginView(APIView):
         if not user.email_verified:
             return Response({"detail": "Email not verified"}, status=403)
 
-        refresh = RefreshToken.for_user(user)
-
-        return Response({
-            "access": str(refresh.access_token),
-            "refresh": str(refresh),
-        })
+        return Response(tokens_for_user(user))
 
 
 # -------------------------------------------------------------------
@@ -160,12 +155,7 @@ class GoogleLoginView(APIView):
             },
         )
 
-        refresh = RefreshToken.for_user(user)
-
-        return Response({
-            "access": str(refresh.access_token),
-            "refresh": str(refresh),
-        })
+        return Response(tokens_for_user(user))
 
 
 # -------------------------------------------------------------------
@@ -149,6 +149,14 @@ RABBITMQ_USER = env("RABBITMQ_USER", default="user")
 RABBITMQ_PASS = env("RABBITMQ_PASS", default="password")
 RABBITMQ_VHOST = env("RABBITMQ_VHOST", default="/")
 AUTH_VALIDATION_QUEUE = env("AUTH_VALIDATION_QUEUE", default="auth_validation_rpc")
+AUTH_RPC_WORKERS = env.int("AUTH_RPC_WORKERS", os.cpu_count() or 1)
+AUTH_RPC_THREADS = env.int("AUTH_RPC_THREADS", 4)
+AUTH_RPC_PREFETCH = env.int("AUTH_RPC_PREFETCH", 8)
+AUTH_RPC_REPORT_INTERVAL = env.int("AUTH_RPC_REPORT_INTERVAL", 60)
+AUTH_TOKEN_CACHE_SIZE = env.int("AUTH_TOKEN_CACHE_SIZE", 10000)
+AUTH_TOKEN_CACHE_TTL = env.int("AUTH_TOKEN_CACHE_TTL", 300)
+AUTH_USER_EVENTS_EXCHANGE = env("AUTH_USER_EVENTS_EXCHANGE", default="auth_user_events")
+AUTH_USER_EVENTS_MAX_PENDING = env.int("AUTH_USER_EVENTS_MAX_PENDING", 1000)
 
 CORS_ALLOW_ALL_ORIGINS = True
 
@@ -151,21 +151,29 @@
 
 import os
 import json
-import time
+import argparse
 import django
-import pika
 import logging
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "auth_service.settings")
 django.setup()
 
 from django.conf import settings
-from django.db import close_old_connections
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.db.models.functions import Lower
+from accounts.token_cache import TokenCache
+from accounts.utils import get_revocations
+from accounts.rpc_runtime import RPCServer
 
 User = get_user_model()
 auth_handler = JWTAuthentication()
+token_cache = TokenCache(
+    max_size=settings.AUTH_TOKEN_CACHE_SIZE,
+    max_ttl=settings.AUTH_TOKEN_CACHE_TTL,
+)
 
 logger = logging.getLogger("auth_rpc")
 logger.setLevel(logging.INFO)
@@ -174,89 +182,184 @@ handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"
 logger.addHandler(handler)
 
 
+INVALID_TOKEN = {"ok": False, "detail": "invalid_or_expired_token"}
+
+
+def user_response(user):
+    return {
+        "ok": True,
+        "user": {
+            "id": user.id,
+            "email": user.email,
+            "full_name": user.full_name,
+            "email_verified": user.email_verified,
+        },
+    }
+
+
 def validate_token(access_token: str):
+    if access_token:
+        cached = token_cache.get(access_token)
+        if cached is not None:
+            return cached
+
     try:
         validated_token = auth_handler.get_validated_token(access_token)
+        # Read before the user is loaded; see TokenCache.
+        generation = token_cache.generation(validated_token[jwt_settings.USER_ID_CLAIM])
         user = auth_handler.get_user(validated_token)
 
-        return {
-            "ok": True,
-            "user": {
-                "id": user.id,
-                "email": user.email,
-                "full_name": user.full_name,
-                "email_verified": user.email_verified,
-            },
-        }
+        response = user_response(user)
+        token_cache.set(access_token, validated_token["exp"], user.id, response, generation)
+        return response
     except Exception as e:
         logger.warning(f"Token validation failed: {e}")
-        return {"ok": False, "detail": "invalid_or_expired_token"}
+        return INVALID_TOKEN
 
 
-def create_rabbit_connection():
-    credentials = pika.PlainCredentials(
-        settings.RABBITMQ_USER,
-        settings.RABBITMQ_PASS,
-    )
+def validate_batch(tokens):
+    """Validate many tokens, loading all their users with one query."""
+    results = [None] * len(tokens)
+    validated = {}
+
+    for i, token in enumerate(tokens):
+        if token:
+            cached = token_cache.get(token)
+            if cached is not None:
+                results[i] = cached
+                continue
 
-    params = pika.ConnectionParameters(
-        host=settings.RABBITMQ_HOST,
-        port=settings.RABBITMQ_PORT,
-        virtual_host=settings.RABBITMQ_VHOST,
-        credentials=credentials,
-        heartbeat=60,
-        blocked_connection_timeout=30,
+        try:
+            validated[i] = auth_handler.get_validated_token(token)
+        except Exception as e:
+            logger.warning(f"Token validation failed: {e}")
+            results[i] = INVALID_TOKEN
+
+    user_ids = {
+        validated_token.get(jwt_settings.USER_ID_CLAIM)
+        for validated_token in validated.values()
+    }
+    # Read before the users are loaded; see TokenCache.
+    generations = {
+        user_id: token_cache.generation(user_id)
+        for user_id in user_ids
+        if isinstance(user_id, int)
+    }
+    users = {
+        user.id: user
+        for user in User.objects.filter(id__in=user_ids, is_active=True)
+    }
+
+    for i, validated_token in validated.items():
+        user = users.get(validated_token.get(jwt_settings.USER_ID_CLAIM))
+        if user is None:
+            results[i] = INVALID_TOKEN
+            continue
+
+        results[i] = user_response(user)
+        token_cache.set(tokens[i], validated_token["exp"], user.id, results[i], generations.get(user.id))
+
+    return results
+
+
+def lookup_users(emails, user_ids):
+    """Active users matching any of the emails (case-insensitive) or ids, in one query."""
+    emails = {str(email).strip().lower() for email in emails}
+    user_ids = {int(user_id) for user_id in user_ids}
+
+    users = (
+        User.objects.annotate(email_lower=Lower("email"))
+        .filter(Q(email_lower__in=emails) | Q(id__in=user_ids), is_active=True)
     )
+    return [
+        {
+            "id": user.id,
+            "email": user.email,
+            "full_name": user.full_name,
+            "avatar_url": user.avatar.url if user.avatar else "",
+            "updated_at": user.updated_at.timestamp(),
+        }
+        for user in users
+    ]
 
-    return pika.BlockingConnection(params)
 
+def on_user_event(ch, method, props, body):
+    try:
+        payload = json.loads(body.decode())
+        token_cache.evict_user(payload["user_id"])
+    except Exception as e:
+        logger.error(f"Invalid user event: {e}")
 
-def run_rpc_server():
-    queue_name = settings.AUTH_VALIDATION_QUEUE
-    backoff = 1
 
-    while True:
-        try:
-            logger.info("Connecting to RabbitMQ...")
+server = RPCServer(
+    "auth_rpc",
+    workers=settings.AUTH_RPC_THREADS,
+    prefetch=settings.AUTH_RPC_PREFETCH,
+    report_interval=settings.AUTH_RPC_REPORT_INTERVAL,
+)
+server.listen(settings.AUTH_VALIDATION_QUEUE)
 
-            connection = create_rabbit_connection()
-            channel = connection.channel()
 
-            channel.queue_declare(queue=queue_name, durable=True)
-            logger.info(f"Auth RPC server listening on {queue_name}")
+@server.default
+def handle_validate_token(payload):
+    return validate_token(payload.get("token"))
 
-            def on_request(ch, method, props, body):
-                close_old_connections()
 
-                try:
-                    payload = json.loads(body.decode())
-                    token = payload.get("token")
-                except Exception:
-                    response = {"ok": False, "detail": "invalid_payload"}
-                else:
-                    response = validate_token(token)
+@server.action("validate_batch")
+def handle_validate_batch(payload):
+    return {"ok": True, "results": validate_batch(payload.get("tokens") or [])}
 
-                ch.basic_publish(
-                    exchange="",
-                    routing_key=props.reply_to,
-                    properties=pika.BasicProperties(
-                        correlation_id=props.correlation_id
-                    ),
-                    body=json.dumps(response),
-                )
 
-                ch.basic_ack(method.delivery_tag)
+@server.action("get_users")
+def handle_get_users(payload):
+    return {
+        "ok": True,
+        "users": lookup_users(payload.get("emails") or [], payload.get("user_ids") or []),
+    }
 
-            channel.basic_consume(queue=queue_name, on_message_callback=on_request)
-            backoff = 1
-            channel.start_consuming()
 
-        except Exception as e:
-            logger.error(f"RPC server error: {e}. Retrying...")
-            time.sleep(backoff)
-            backoff = min(backoff * 2, 30)
+@server.action("get_revocations")
+def handle_get_revocations(payload):
+    return {"ok": True, "revoked": get_revocations()}
+
+
+@server.on_connect
+def subscribe_user_events(channel):
+    # User changes evict cached validations. Anything missed while
+    # disconnected is unknown, so start from an empty cache.
+    channel.exchange_declare(
+        exchange=settings.AUTH_USER_EVENTS_EXCHANGE,
+        exchange_type="fanout",
+        durable=True,
+    )
+    events_queue = channel.queue_declare(queue="", exclusive=True).method.queue
+    channel.queue_bind(queue=events_queue, exchange=settings.AUTH_USER_EVENTS_EXCHANGE)
+    consumer_tag = channel.basic_consume(
+        queue=events_queue,
+        on_message_callback=on_user_event,
+        auto_ack=True,
+    )
+    token_cache.clear()
+    return consumer_tag
+
+
+@server.reporter
+def report_token_cache():
+    cache = token_cache.stats()
+    logger.info(
+        f"token_cache size={cache['size']} hits={cache['hits']} "
+        f"misses={cache['misses']} hit_ratio={cache['hit_ratio']:.2f}"
+    )
 
 
 if __name__ == "__main__":
-    run_rpc_server()
+    parser = argparse.ArgumentParser(description="Auth token validation RPC server")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.AUTH_RPC_WORKERS,
+        help="number of consumer processes (default: AUTH_RPC_WORKERS)",
+    )
+    args = parser.parse_args()
 
+    server.run(processes=args.workers)
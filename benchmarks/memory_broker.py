@@ -0,0 +1,324 @@
+"""
+In-memory stand-in for RabbitMQ.
+
+MemoryBroker.connect() returns an object with the parts of the
+pika.BlockingConnection / BlockingChannel interface that the RPC clients
+and servers use, so they can talk to each other inside one process:
+
+* the default exchange, plus fanout exchanges (every other exchange type
+  is treated as fanout)
+* named and server-named exclusive queues
+* per-channel prefetch (basic_qos), round-robin across consumers
+* manual acks; unacked messages are requeued when their connection closes
+* per-message expiration, applied when a message reaches the queue head
+* direct reply-to (amq.rabbitmq.reply-to)
+
+As with pika, deliveries and add_callback_threadsafe callbacks run on the
+thread that calls process_data_events.
+
+    broker = MemoryBroker()
+    server = RPCServer("team_rpc", connect=broker.connect)
+    client = RPCClient(None, connect=broker.connect)
+"""
+import copy
+import itertools
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import pika
+from pika.exceptions import ChannelClosedByBroker, ConnectionWrongStateError
+
+DIRECT_REPLY_TO = "amq.rabbitmq.reply-to"
+
+
+class _Message:
+    __slots__ = ("props", "body", "enqueued_at", "redelivered")
+
+    def __init__(self, props, body, redelivered=False):
+        self.props = props
+        self.body = body
+        self.enqueued_at = time.monotonic()
+        self.redelivered = redelivered
+
+    def expired(self, now):
+        expiration = self.props.expiration
+        return expiration is not None and self.enqueued_at + int(expiration) / 1000 <= now
+
+
+class MemoryBroker:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.queues = {}          # name -> deque of _Message
+        self.consumers = {}       # name -> deque of consumers, rotated for round-robin
+        self.exchanges = {}       # name -> set of bound queue names
+        self.reply_channels = {}  # generated reply-to name -> channel consuming it
+        self._ids = itertools.count(1)
+
+        self.published = 0
+        self.delivered = 0
+        self.expired = 0
+        self.unroutable = 0
+
+    def connect(self, *args, **kwargs):
+        return MemoryConnection(self)
+
+    def declare_queue(self, queue):
+        with self.lock:
+            if not queue:
+                queue = f"amq.gen-{next(self._ids)}"
+            self.queues.setdefault(queue, deque())
+            self.consumers.setdefault(queue, deque())
+            return queue
+
+    def delete_queue(self, queue):
+        with self.lock:
+            self.queues.pop(queue, None)
+            self.consumers.pop(queue, None)
+            for bound in self.exchanges.values():
+                bound.discard(queue)
+
+    def publish(self, exchange, routing_key, props, body):
+        with self.lock:
+            self.published += 1
+            targets = self.exchanges.get(exchange, ()) if exchange else (routing_key,)
+
+            for queue in list(targets):
+                channel = self.reply_channels.get(queue)
+                if channel is not None:
+                    channel.deliver_reply(props, body)
+                elif queue in self.queues:
+                    self.queues[queue].append(_Message(props, body))
+                    self.dispatch(queue)
+                else:
+                    self.unroutable += 1
+
+    def dispatch(self, queue):
+        """Hand queued messages to consumers with free prefetch slots."""
+        with self.lock:
+            messages = self.queues.get(queue)
+            consumers = self.consumers.get(queue)
+            now = time.monotonic()
+
+            while messages and consumers:
+                if messages[0].expired(now):
+                    messages.popleft()
+                    self.expired += 1
+                    continue
+
+                for _ in range(len(consumers)):
+                    consumer = consumers[0]
+                    consumers.rotate(-1)
+                    if consumer.channel.has_capacity(consumer):
+                        break
+                else:
+                    return
+
+                self.delivered += 1
+                consumer.channel.deliver(consumer, queue, messages.popleft())
+
+    def stats(self):
+        with self.lock:
+            return {
+                "published": self.published,
+                "delivered": self.delivered,
+                "expired": self.expired,
+                "unroutable": self.unroutable,
+                "queued": {name: len(messages) for name, messages in self.queues.items()},
+            }
+
+
+class MemoryChannel:
+    def __init__(self, connection):
+        self.connection = connection
+        self.broker = connection.broker
+        self.is_open = True
+        self.is_closed = False
+
+        self.prefetch = 0
+        self.consumers = {}   # consumer tag -> consumer
+        self.unacked = {}     # delivery tag -> (queue, _Message)
+        self.reply_to = None
+        self.reply_consumer = None
+        self._delivery_tags = itertools.count(1)
+
+    # ---------- declarations ----------
+
+    def basic_qos(self, prefetch_count=0, **kwargs):
+        self.prefetch = prefetch_count
+
+    def queue_declare(self, queue="", durable=False, exclusive=False, **kwargs):
+        queue = self.broker.declare_queue(queue)
+        if exclusive:
+            self.connection.exclusive_queues.append(queue)
+
+        with self.broker.lock:
+            depth = len(self.broker.queues[queue])
+        return SimpleNamespace(method=SimpleNamespace(queue=queue, message_count=depth))
+
+    def exchange_declare(self, exchange, exchange_type="direct", **kwargs):
+        with self.broker.lock:
+            self.broker.exchanges.setdefault(exchange, set())
+
+    def queue_bind(self, queue, exchange, routing_key=None, **kwargs):
+        with self.broker.lock:
+            self.broker.exchanges.setdefault(exchange, set()).add(queue)
+
+    # ---------- consuming ----------
+
+    def basic_consume(self, queue, on_message_callback, auto_ack=False, **kwargs):
+        broker = self.broker
+
+        with broker.lock:
+            consumer = SimpleNamespace(
+                tag=f"ctag-{next(broker._ids)}",
+                channel=self,
+                queue=queue,
+                callback=on_message_callback,
+                auto_ack=auto_ack,
+            )
+
+            if queue == DIRECT_REPLY_TO:
+                self.reply_to = f"{DIRECT_REPLY_TO}.{next(broker._ids)}"
+                self.reply_consumer = consumer
+                broker.reply_channels[self.reply_to] = self
+            elif queue not in broker.queues:
+                raise ChannelClosedByBroker(404, f"NOT_FOUND - no queue '{queue}'")
+            else:
+                broker.consumers[queue].append(consumer)
+
+            self.consumers[consumer.tag] = consumer
+            broker.dispatch(queue)
+
+        return consumer.tag
+
+    def basic_cancel(self, consumer_tag):
+        with self.broker.lock:
+            consumer = self.consumers.pop(consumer_tag, None)
+            if consumer is not None and consumer.queue in self.broker.consumers:
+                self.broker.consumers[consumer.queue].remove(consumer)
+
+    def has_capacity(self, consumer):
+        return consumer.auto_ack or not self.prefetch or len(self.unacked) < self.prefetch
+
+    def deliver(self, consumer, queue, message):
+        delivery_tag = next(self._delivery_tags)
+        if not consumer.auto_ack:
+            self.unacked[delivery_tag] = (queue, message)
+
+        method = SimpleNamespace(
+            consumer_tag=consumer.tag,
+            delivery_tag=delivery_tag,
+            exchange="",
+            routing_key=queue,
+            redelivered=message.redelivered,
+        )
+        self.connection.enqueue(consumer.callback, self, method, message.props, message.body)
+
+    def deliver_reply(self, props, body):
+        self.deliver(self.reply_consumer, self.reply_to, _Message(props, body))
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        if not self.is_open:
+            raise ConnectionWrongStateError("Channel is closed")
+
+        with self.broker.lock:
+            entry = self.unacked.pop(delivery_tag, None)
+            if entry is not None:
+                self.broker.dispatch(entry[0])
+
+    # ---------- publishing ----------
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        if not self.is_open:
+            raise ConnectionWrongStateError("Channel is closed")
+
+        properties = properties or pika.BasicProperties()
+        if properties.reply_to == DIRECT_REPLY_TO:
+            if self.reply_to is None:
+                raise ChannelClosedByBroker(406, "PRECONDITION_FAILED - fast reply consumer does not exist")
+            properties = copy.copy(properties)
+            properties.reply_to = self.reply_to
+
+        self.broker.publish(exchange, routing_key, properties, body)
+
+    def close(self):
+        broker = self.broker
+
+        with broker.lock:
+            self.is_open = False
+            self.is_closed = True
+
+            for consumer_tag in list(self.consumers):
+                self.basic_cancel(consumer_tag)
+            if self.reply_to is not None:
+                broker.reply_channels.pop(self.reply_to, None)
+
+            # Like RabbitMQ, unacked deliveries go back to the head of their queue.
+            unacked, self.unacked = self.unacked, {}
+            for queue, message in sorted(unacked.items(), reverse=True):
+                if queue in broker.queues:
+                    message.redelivered = True
+                    broker.queues[queue].appendleft(message)
+            for queue in {queue for queue, _ in unacked.values()}:
+                broker.dispatch(queue)
+
+
+class MemoryConnection:
+    def __init__(self, broker):
+        self.broker = broker
+        self.is_open = True
+        self.is_closed = False
+        self.exclusive_queues = []
+
+        self._channels = []
+        self._events = deque()
+        self._cond = threading.Condition()
+
+    def channel(self):
+        channel = MemoryChannel(self)
+        self._channels.append(channel)
+        return channel
+
+    def enqueue(self, callback, *args):
+        with self._cond:
+            self._events.append((callback, args))
+            self._cond.notify_all()
+
+    def add_callback_threadsafe(self, callback):
+        if not self.is_open:
+            raise ConnectionWrongStateError("Connection is closed")
+        self.enqueue(callback)
+
+    def process_data_events(self, time_limit=0):
+        if not self.is_open:
+            raise ConnectionWrongStateError("Connection is closed")
+
+        # Like pika: return once something was dispatched, or after
+        # time_limit seconds (None waits for the first event).
+        with self._cond:
+            if not self._events and time_limit != 0:
+                self._cond.wait(time_limit)
+            events, self._events = self._events, deque()
+
+        for callback, args in events:
+            if not self.is_open:
+                break
+            callback(*args)
+
+    def close(self):
+        if not self.is_open:
+            return
+
+        self.is_open = False
+        self.is_closed = True
+
+        for channel in self._channels:
+            channel.close()
+        for queue in self.exclusive_queues:
+            self.broker.delete_queue(queue)
+
+        with self._cond:
+            self._events.clear()
+            self._cond.notify_all()
@@ -0,0 +1,96 @@
+"""
+RPC codec micro-benchmark.
+
+Encodes and decodes payloads shaped like real RPC traffic with every codec
+rpc_codec offers and reports the body size and per-message CPU time:
+
+* validate_token - one auth_service validation reply
+* validate_batch - a 50-token batched validation reply
+* membership     - one team_service get_membership reply
+* team_tasks     - get_team_tasks for a team with --tasks tasks
+
+    python benchmarks/rpc_codecs.py --tasks 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "chat_service"))
+
+from chat import rpc_codec  # noqa: E402
+
+STATUSES = ["todo", "in_progress", "review", "done"]
+
+
+def user(user_id):
+    return {
+        "ok": True,
+        "user": {
+            "id": user_id,
+            "email": f"user{user_id}@example.com",
+            "full_name": f"Example User {user_id}",
+            "email_verified": True,
+        },
+    }
+
+
+def payloads(tasks):
+    return {
+        "validate_token": user(42),
+        "validate_batch": {"ok": True, "results": [user(i) for i in range(50)]},
+        "membership": {"ok": True, "is_member": True, "role": "member"},
+        "team_tasks": {
+            "ok": True,
+            "data": [
+                {
+                    "id": i,
+                    "title": f"Task {i}: follow up on the sprint review notes",
+                    "status": STATUSES[i % len(STATUSES)],
+                    "assigned_to": 1000 + i % 25,
+                }
+                for i in range(tasks)
+            ],
+        },
+    }
+
+
+def timed(fn, *args):
+    """Best-of-5 seconds per call, repeating fn enough to fill ~50 ms."""
+    start = time.perf_counter()
+    fn(*args)
+    once = time.perf_counter() - start
+    repeat = max(1, int(0.05 / max(once, 1e-7)))
+
+    best = None
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn(*args)
+        elapsed = (time.perf_counter() - start) / repeat
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--tasks", type=int, default=5000, help="tasks in the team_tasks payload")
+    args = parser.parse_args()
+
+    if rpc_codec.MSGPACK not in rpc_codec.CODECS:
+        print("msgpack is not installed; only JSON is measured")
+
+    print(f"{'payload':<16}{'codec':<22}{'bytes':>10}{'encode us':>12}{'decode us':>12}")
+
+    for name, payload in payloads(args.tasks).items():
+        for content_type in rpc_codec.CODECS:
+            body = rpc_codec.encode(payload, content_type)
+            assert rpc_codec.decode(body, content_type) == payload
+
+            encode = timed(rpc_codec.encode, payload, content_type) * 1e6
+            decode = timed(rpc_codec.decode, body, content_type) * 1e6
+            print(f"{name:<16}{content_type:<22}{len(body):>10}{encode:>12.1f}{decode:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
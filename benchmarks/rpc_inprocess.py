@@ -0,0 +1,197 @@
+"""
+In-process RPC server benchmark.
+
+Runs the real RPC server of one service - auth_service/rabbit.py,
+team_service/teams/rpc_server.py or task_service/tasks/rpc_worker.py -
+against the in-memory broker (memory_broker.py) and a throwaway SQLite
+database, and drives it with the shared RPC client from many threads.
+Prefetch, worker threads, reply-to and correlation ids all behave as they
+do with RabbitMQ; only the network is missing.
+
+    python benchmarks/rpc_inprocess.py team --threads 16 --calls 200
+    python benchmarks/rpc_inprocess.py team --batch 20
+    python benchmarks/rpc_inprocess.py task --tasks 5000 --codec json
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVICES = {
+    "auth": ("auth_service", "auth_service.settings"),
+    "team": ("team_service", "team_service.settings"),
+    "task": ("task_service", "task_service.settings"),
+}
+
+
+def setup_django(service, database):
+    directory, settings_module = SERVICES[service]
+    sys.path.insert(0, os.path.join(ROOT, directory))
+    os.environ["DJANGO_SETTINGS_MODULE"] = settings_module
+
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+
+    settings.DATABASES = {
+        "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": database},
+    }
+    django.setup()
+    call_command("migrate", verbosity=0, skip_checks=True)
+
+
+# ---------- per-service fixtures ----------
+
+def auth_fixture(args):
+    from accounts.utils import tokens_for_user
+    from django.contrib.auth import get_user_model
+    from django.conf import settings
+
+    import rabbit
+
+    User = get_user_model()
+    tokens = [
+        tokens_for_user(
+            User.objects.create_user(
+                username=f"user{i}",
+                email=f"user{i}@example.com",
+                password="benchmark",
+                full_name=f"User {i}",
+            )
+        )["access"]
+        for i in range(args.users)
+    ]
+
+    def payload():
+        return {"token": random.choice(tokens)}
+
+    return rabbit.server, settings.AUTH_VALIDATION_QUEUE, payload
+
+
+def team_fixture(args):
+    from django.conf import settings
+    from teams.models import Team, TeamMember
+    from teams import rpc_server
+
+    team = Team.objects.create(name="Benchmark", code="BENCH", created_by=1)
+    TeamMember.objects.bulk_create(
+        TeamMember(team=team, user_id=user_id, role="member")
+        for user_id in range(1, args.users + 1)
+    )
+
+    def payload():
+        # Some lookups miss, like checks for users outside the team.
+        if args.batch > 1:
+            return {
+                "action": "get_memberships",
+                "team_id": team.id,
+                "user_ids": [random.randint(1, args.users * 2) for _ in range(args.batch)],
+            }
+        return {"user_id": random.randint(1, args.users * 2), "team_id": team.id}
+
+    return rpc_server.server, settings.TEAM_RPC_QUEUE, payload
+
+
+def task_fixture(args):
+    from django.conf import settings
+    from tasks.models import Task
+    from tasks import rpc_worker
+
+    Task.objects.bulk_create(
+        Task(
+            title=f"Task {i}",
+            team_id=1,
+            created_by=1,
+            assigned_to=1 + i % args.users,
+        )
+        for i in range(args.tasks)
+    )
+
+    def payload():
+        if random.random() < 0.5:
+            return {"action": "get_team_tasks", "team_id": 1}
+        return {"action": "get_user_tasks", "user_id": random.randint(1, args.users)}
+
+    return rpc_worker.server, settings.TASK_RPC_QUEUE, payload
+
+
+FIXTURES = {
+    "auth": auth_fixture,
+    "team": team_fixture,
+    "task": task_fixture,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("service", choices=sorted(SERVICES))
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--calls", type=int, default=100, help="calls per thread")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause between calls per thread")
+    parser.add_argument("--workers", type=int, help="server worker threads (default: service setting)")
+    parser.add_argument("--prefetch", type=int, help="server prefetch (default: service setting)")
+    parser.add_argument("--codec", default="msgpack", choices=["json", "msgpack"])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=500, help="tasks in the team (task service)")
+    parser.add_argument("--batch", type=int, default=1, help="users per get_memberships call (team service)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(args.service, os.path.join(tmp, "db.sqlite3"))
+
+        sys.path.insert(0, os.path.join(ROOT, "chat_service"))
+        from chat import rpc_client, rpc_codec
+        from memory_broker import MemoryBroker
+        from rpc_roundtrip import measure
+
+        server, queue, payload = FIXTURES[args.service](args)
+
+        broker = MemoryBroker()
+        server.connect = broker.connect
+        server.report_interval = 0
+        if args.workers:
+            server.workers = args.workers
+        if args.prefetch or args.workers:
+            server.prefetch = args.prefetch or server.workers * 2
+
+        server_thread = threading.Thread(target=server.serve, kwargs={"handle_signals": False})
+        server_thread.start()
+
+        client = rpc_client.RPCClient(
+            None,
+            connect=broker.connect,
+            content_type=rpc_codec.content_type_for(args.codec),
+        )
+        try:
+            stats = measure(
+                lambda n, i: client.call(queue, payload(), timeout=30),
+                args.threads,
+                args.calls,
+                args.think_ms / 1000,
+            )
+        finally:
+            client.close()
+            server.stop()
+            server_thread.join()
+
+        print(
+            f"service={args.service} threads={args.threads} calls/thread={args.calls} "
+            f"workers={server.workers} prefetch={server.prefetch} codec={args.codec}"
+        )
+        print(f"{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'calls/s':>10}")
+        print(f"{stats['p50']:>10.2f}{stats['p99']:>10.2f}{stats['mean']:>10.2f}{stats['rps']:>10.0f}")
+
+        print(f"{'action':<20}{'count':>8}{'avg ms':>10}{'p99 ms':>10}")
+        for action, action_stats in sorted(server.metrics.snapshot()["actions"].items()):
+            print(
+                f"{action:<20}{action_stats['count']:>8}"
+                f"{action_stats['avg_ms']:>10.2f}{action_stats['p99_ms']:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
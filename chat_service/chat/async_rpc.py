@@ -0,0 +1,325 @@
+"""
+asyncio RPC client for Channels consumers and other async code.
+
+Calls run on the event loop instead of borrowing a thread from the sync
+executor for the whole round-trip. Each event loop shares one connection;
+replies arrive on the direct reply-to pseudo queue and are matched to the
+awaiting coroutine by correlation id. Idempotent lookups can share one
+in-flight call per payload (single_flight=True), as with RPCClient.
+"""
+import asyncio
+import functools
+import logging
+import time
+import uuid
+import weakref
+
+import aio_pika
+from django.conf import settings
+
+from . import rpc_codec
+from .rpc_client import DEADLINE_HEADER, DIRECT_REPLY_TO, RPCError, RPCTimeout, RPCUnavailable
+
+logger = logging.getLogger("rpc_client")
+
+
+class AsyncRPCClient:
+    def __init__(self, host, port, login, password, virtualhost, content_type=rpc_codec.JSON):
+        self.connect_kwargs = {
+            "host": host,
+            "port": port,
+            "login": login,
+            "password": password,
+            "virtualhost": virtualhost,
+        }
+        self.content_type = content_type
+        self.connection = None
+        self.channel = None
+
+        self._pending = {}
+        self._flights = {}
+        self._connect_lock = asyncio.Lock()
+
+    def _is_connected(self):
+        return self.channel is not None and not self.channel.is_closed
+
+    async def _connect(self):
+        async with self._connect_lock:
+            if self._is_connected():
+                return
+
+            connection = await aio_pika.connect(**self.connect_kwargs)
+            connection.close_callbacks.add(self._on_close)
+
+            channel = await connection.channel()
+            reply_queue = await channel.get_queue(DIRECT_REPLY_TO, ensure=False)
+            await reply_queue.consume(self._on_response, no_ack=True)
+
+            self.connection = connection
+            self.channel = channel
+            logger.info("Async RPC client connected")
+
+    def _on_close(self, *args):
+        self.connection = None
+        self.channel = None
+
+        # Replies for calls published on the old connection can never arrive.
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(RPCUnavailable("RPC connection lost"))
+
+    async def _on_response(self, message):
+        future = self._pending.pop(message.correlation_id, None)
+        if future is not None and not future.done():
+            future.set_result((message.content_type, message.body))
+
+    async def call(self, queue, payload, timeout=5, single_flight=False):
+        body = rpc_codec.encode(payload, self.content_type)
+
+        if not single_flight:
+            content_type, response = await self._call(queue, body, timeout)
+            return rpc_codec.decode(response, content_type)
+
+        key = (queue, body)
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._call(queue, body, timeout))
+            self._flights[key] = task
+            task.add_done_callback(functools.partial(self._flight_done, key))
+
+        try:
+            # Shielded so one waiter timing out doesn't cancel it for the rest.
+            content_type, response = await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            raise RPCTimeout(f"RPC call to {queue} timed out")
+
+        return rpc_codec.decode(response, content_type)
+
+    def _flight_done(self, key, task):
+        self._flights.pop(key, None)
+        if not task.cancelled():
+            # Retrieved here in case every waiter already gave up.
+            task.exception()
+
+    async def _call(self, queue, body, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        if not self._is_connected():
+            try:
+                await asyncio.wait_for(self._connect(), timeout)
+            except Exception as e:
+                raise RPCUnavailable(f"RPC connection not available: {e}")
+
+        corr_id = str(uuid.uuid4())
+        future = loop.create_future()
+        self._pending[corr_id] = future
+        remaining = max(deadline - loop.time(), 0.001)
+
+        try:
+            await self.channel.default_exchange.publish(
+                aio_pika.Message(
+                    body=body,
+                    correlation_id=corr_id,
+                    reply_to=DIRECT_REPLY_TO,
+                    content_type=self.content_type,
+                    expiration=remaining,
+                    headers={DEADLINE_HEADER: time.time() + remaining},
+                ),
+                routing_key=queue,
+            )
+        except Exception as e:
+            self._pending.pop(corr_id, None)
+            raise RPCUnavailable(f"RPC publish to {queue} failed: {e}")
+
+        try:
+            return await asyncio.wait_for(future, max(deadline - loop.time(), 0))
+        except asyncio.TimeoutError:
+            raise RPCTimeout(f"RPC call to {queue} timed out")
+        finally:
+            self._pending.pop(corr_id, None)
+
+    async def close(self):
+        if self.connection is not None:
+            await self.connection.close()
+
+
+class AsyncCallBatcher:
+    """
+    asyncio counterpart of rpc_client.CallBatcher.
+
+    The first coroutine to arrive schedules a flush `window` seconds later;
+    everything submitted on the same loop until then goes out as one call,
+    with duplicate items sent once.
+    """
+
+    def __init__(self, flush, window=0.002, max_size=100):
+        self.flush = flush
+        self.window = window
+        self.max_size = max_size
+
+        self._batch = []
+        self._tasks = set()
+
+    async def submit(self, item, timeout=5):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        batch = self._batch
+        batch.append((item, future))
+
+        if len(batch) >= self.max_size:
+            self._batch = []
+            self._start(batch, timeout)
+        elif len(batch) == 1:
+            loop.call_later(self.window, self._flush_pending, batch, timeout)
+
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise RPCTimeout("Batched RPC call timed out")
+
+    def _flush_pending(self, batch, timeout):
+        # Already flushed if it filled up in the meantime.
+        if self._batch is batch:
+            self._batch = []
+            self._start(batch, timeout)
+
+    def _start(self, batch, timeout):
+        task = asyncio.get_running_loop().create_task(self._run(batch, timeout))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch, timeout):
+        items = list(dict.fromkeys(item for item, _ in batch))
+
+        try:
+            results = list(await self.flush(items, timeout))
+            if len(results) != len(items):
+                raise RPCError(f"Batched call returned {len(results)} results for {len(items)} items")
+            results = dict(zip(items, results))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for item, future in batch:
+            if not future.done():
+                future.set_result(results[item])
+
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_rpc_client():
+    """Return the RPC client shared by every coroutine on the running loop."""
+    loop = asyncio.get_running_loop()
+
+    client = _clients.get(loop)
+    if client is None:
+        client = AsyncRPCClient(
+            host=settings.RABBITMQ_HOST,
+            port=settings.RABBITMQ_PORT,
+            login=settings.RABBITMQ_USER,
+            password=settings.RABBITMQ_PASS,
+            virtualhost=settings.RABBITMQ_VHOST,
+            content_type=rpc_codec.content_type_for(getattr(settings, "RPC_CODEC", "json")),
+        )
+        _clients[loop] = client
+
+    return client
+
+
+# ---------- service helpers ----------
+
+async def _validate_tokens(tokens, timeout):
+    client = get_async_rpc_client()
+
+    if len(tokens) == 1:
+        return [
+            await client.call(
+                settings.AUTH_VALIDATION_QUEUE,
+                {"token": tokens[0]},
+                timeout=timeout,
+                single_flight=True,
+            )
+        ]
+
+    res = await client.call(
+        settings.AUTH_VALIDATION_QUEUE,
+        {"action": "validate_batch", "tokens": tokens},
+        timeout=timeout,
+    )
+    # validate_batch is only known to an upgraded auth_service, so roll it
+    # out before the clients; an older one answers it as an invalid token.
+    results = res.get("results") if res.get("ok") else None
+    if not isinstance(results, list):
+        raise RPCError(f"validate_batch failed: {res.get('error') or res.get('detail')}")
+    return results
+
+
+_token_batchers = weakref.WeakKeyDictionary()
+
+
+async def verify_token(token, timeout=5):
+    # A reconnect burst validates many sockets' tokens in one message.
+    loop = asyncio.get_running_loop()
+
+    batcher = _token_batchers.get(loop)
+    if batcher is None:
+        batcher = AsyncCallBatcher(_validate_tokens)
+        _token_batchers[loop] = batcher
+
+    try:
+        return await batcher.submit(token, timeout=timeout)
+    except RPCError:
+        return {"ok": False, "error": "auth_rpc_error"}
+
+
+async def check_membership(user_id, team_id, timeout=5):
+    return await get_async_rpc_client().call(
+        settings.TEAM_RPC_QUEUE,
+        {
+            "user_id": user_id,
+            "team_id": team_id,
+        },
+        timeout=timeout,
+        single_flight=True,
+    )
+
+
+async def check_memberships(team_id, user_ids, timeout=5):
+    return await get_async_rpc_client().call(
+        settings.TEAM_RPC_QUEUE,
+        {
+            "action": "get_memberships",
+            "team_id": team_id,
+            "user_ids": list(user_ids),
+        },
+        timeout=timeout,
+        single_flight=True,
+    )
+
+
+async def get_user_tasks(user_id, timeout=5):
+    return await get_async_rpc_client().call(
+        settings.TASK_RPC_QUEUE,
+        {
+            "action": "get_user_tasks",
+            "user_id": user_id,
+        },
+        timeout=timeout,
+    )
+
+
+async def get_team_tasks(team_id, timeout=5):
+    return await get_async_rpc_client().call(
+        settings.TASK_RPC_QUEUE,
+        {
+            "action": "get_team_tasks",
+            "team_id": team_id,
+        },
+        timeout=timeout,
+    )
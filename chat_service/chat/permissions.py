@@ -1,6 +1,7 @@
 from rest_framework.permissions import BasePermission
 from rest_framework.exceptions import AuthenticationFailed
 from .rpc import AuthRPCClient
+from . import jwt_auth
 
 
 class IsAuthenticatedByAuthService(BasePermission):
@@ -19,15 +20,18 @@ class IsAuthenticatedByAuthService(BasePermission):
         if not token:
             raise AuthenticationFailed("Token missing")
 
-        rpc = AuthRPCClient()
-        try:
-            res = rpc.verify_token(token)
-        except TimeoutError:
-            raise AuthenticationFailed("Auth service timeout")
-        except Exception:
-            raise AuthenticationFailed("Auth service unavailable")
-        finally:
-            rpc.close()
+        res = jwt_auth.verify_token(token)
+
+        if res is None:
+            rpc = AuthRPCClient()
+            try:
+                res = rpc.verify_token(token)
+            except TimeoutError:
+                raise AuthenticationFailed("Auth service timeout")
+            except Exception:
+                raise AuthenticationFailed("Auth service unavailable")
+            finally:
+                rpc.close()
 
         if not res or not res.get("ok"):
             raise AuthenticationFailed("Invalid or expired token")
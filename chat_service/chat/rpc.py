@@ -1,70 +1,45 @@
-import json
-import uuid
-import time
-import pika
 from django.conf import settings
 
+from .rpc_client import get_rpc_client, CallBatcher, RPCError, RPCTimeout
 
-class AuthRPCClient:
-    def __init__(self):
-        credentials = pika.PlainCredentials(
-            settings.RABBITMQ_USER,
-            settings.RABBITMQ_PASS,
-        )
 
-        params = pika.ConnectionParameters(
-            host=settings.RABBITMQ_HOST,
-            port=settings.RABBITMQ_PORT,
-            virtual_host=settings.RABBITMQ_VHOST,
-            credentials=credentials,
-            heartbeat=60,
-            blocked_connection_timeout=30,
-        )
+def _validate_tokens(tokens, timeout):
+    rpc = get_rpc_client()
 
-        self.connection = pika.BlockingConnection(params)
-        self.channel = self.connection.channel()
+    if len(tokens) == 1:
+        return [
+            rpc.call(
+                settings.AUTH_VALIDATION_QUEUE,
+                {"token": tokens[0]},
+                timeout=timeout,
+                single_flight=True,
+            )
+        ]
 
-        result = self.channel.queue_declare(queue="", exclusive=True)
-        self.callback_queue = result.method.queue
+    res = rpc.call(
+        settings.AUTH_VALIDATION_QUEUE,
+        {"action": "validate_batch", "tokens": tokens},
+        timeout=timeout,
+    )
+    # validate_batch is only known to an upgraded auth_service, so roll it
+    # out before the clients; an older one answers it as an invalid token.
+    results = res.get("results") if res.get("ok") else None
+    if not isinstance(results, list):
+        raise RPCError(f"validate_batch failed: {res.get('error') or res.get('detail')}")
+    return results
 
-        self.response = None
-        self.corr_id = None
 
-        self.channel.basic_consume(
-            queue=self.callback_queue,
-            on_message_callback=self._on_response,
-            auto_ack=True,
-        )
+# Concurrent validations from different request threads share one message.
+token_batcher = CallBatcher(_validate_tokens)
 
-    def _on_response(self, ch, method, props, body):
-        if self.corr_id == props.correlation_id:
-            self.response = json.loads(body)
 
+class AuthRPCClient:
     def verify_token(self, token, timeout=5):
-        self.response = None
-        self.corr_id = str(uuid.uuid4())
-
-        self.channel.basic_publish(
-            exchange="",
-            routing_key=settings.AUTH_VALIDATION_QUEUE,
-            properties=pika.BasicProperties(
-                reply_to=self.callback_queue,
-                correlation_id=self.corr_id,
-            ),
-            body=json.dumps({"token": token}),
-        )
-
-        start = time.time()
-        while self.response is None:
-            if time.time() - start > timeout:
-                raise TimeoutError("Auth RPC timeout")
-            self.connection.process_data_events(time_limit=0.2)
-
-        return self.response
+        try:
+            return token_batcher.submit(token, timeout=timeout)
+        except RPCTimeout:
+            raise TimeoutError("Auth RPC timeout")
 
     def close(self):
-        try:
-            self.channel.close()
-            self.connection.close()
-        except Exception:
-            pass
+        # The connection is shared by the whole process and stays open.
+        pass
@@ -5,7 +5,7 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 
 from .models import RoomParticipant
-from .rpc import AuthRPCClient
+from . import async_rpc, jwt_auth
 
 
 class SignalingConsumer(AsyncWebsocketConsumer):
@@ -99,13 +99,10 @@ class SignalingConsumer(AsyncWebsocketConsumer):
             user_id=self.user_id,
         ).exists()
 
-    @database_sync_to_async
-    def authenticate(self, token):
-        rpc = AuthRPCClient()
-        try:
-            data = rpc.verify_token(token)
-        finally:
-            rpc.close()
+    async def authenticate(self, token):
+        data = jwt_auth.verify_token(token)
+        if data is None:
+            data = await async_rpc.verify_token(token)
 
         if not data or not data.get("ok"):
             return None
@@ -1,59 +1,22 @@
-import json
-import uuid
-import pika
-import os
-import threading
-import time
+from django.conf import settings
 
-
-RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
+from .rpc_client import get_rpc_client, RPCError
 
 
 class TaskRPCClient:
     def __init__(self, timeout=5):
         self.timeout = timeout
-        self.connection = pika.BlockingConnection(
-            pika.ConnectionParameters(host=RABBITMQ_HOST)
-        )
-        self.channel = self.connection.channel()
-
-        result = self.channel.queue_declare(queue="", exclusive=True)
-        self.callback_queue = result.method.queue
-
-        self.response = None
-        self.corr_id = None
-
-        self.channel.basic_consume(
-            queue=self.callback_queue,
-            on_message_callback=self.on_response,
-            auto_ack=True,
-        )
-
-    def on_response(self, ch, method, props, body):
-        if self.corr_id == props.correlation_id:
-            self.response = json.loads(body)
+        self.rpc = get_rpc_client()
 
     def call(self, payload):
-        self.response = None
-        self.corr_id = str(uuid.uuid4())
-
-        self.channel.basic_publish(
-            exchange="",
-            routing_key="task_rpc_queue",
-            properties=pika.BasicProperties(
-                reply_to=self.callback_queue,
-                correlation_id=self.corr_id,
-            ),
-            body=json.dumps(payload),
-        )
-
-        start = time.time()
-        while self.response is None:
-            self.connection.process_data_events()
-            if time.time() - start > self.timeout:
-                return {"ok": False, "error": "Task service timeout"}
-
-        return self.response
+        try:
+            return self.rpc.call(
+                settings.TASK_RPC_QUEUE,
+                payload,
+                timeout=self.timeout,
+            )
+        except RPCError:
+            return {"ok": False, "error": "Task service timeout"}
 
     def get_user_tasks(self, user_id):
         return self.call({
@@ -68,7 +31,5 @@ class TaskRPCClient:
         })
 
     def close(self):
-        try:
-            self.connection.close()
-        except Exception:
-            pass
+        # The connection is shared by the whole process and stays open.
+        pass
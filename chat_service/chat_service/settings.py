@@ -91,6 +91,21 @@ RABBITMQ_VHOST = os.environ.get("RABBITMQ_VHOST")
 AUTH_VALIDATION_QUEUE = os.environ.get("AUTH_VALIDATION_QUEUE")
 
 TEAM_RPC_QUEUE = os.environ.get("TEAM_RPC_QUEUE")
+TASK_RPC_QUEUE = os.environ.get("TASK_RPC_QUEUE", "task_rpc_queue")
+
+# Seconds a user's team memberships snapshot answers role checks before it
+# is revalidated with team_service.
+TEAM_SNAPSHOT_TTL = int(os.environ.get("TEAM_SNAPSHOT_TTL", 5))
+# Seconds after which a snapshot is fetched in full even if team_service
+# keeps answering "unchanged", in case a version bump was lost.
+TEAM_SNAPSHOT_MAX_AGE = int(os.environ.get("TEAM_SNAPSHOT_MAX_AGE", 300))
+
+# Codec for outgoing RPC requests ("msgpack" or "json"); servers answer in kind.
+RPC_CODEC = os.environ.get("RPC_CODEC", "msgpack")
+
+# Set to auth_service's JWT signing key to verify access tokens locally.
+AUTH_JWT_SIGNING_KEY = os.environ.get("AUTH_JWT_SIGNING_KEY")
+AUTH_REVOCATION_REFRESH = int(os.environ.get("AUTH_REVOCATION_REFRESH", 30))
 
 USE_S3 = os.environ.get("USE_S3", "False").lower() == "true"
 
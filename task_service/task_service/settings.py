@@ -87,6 +87,29 @@ AUTH_PASSWORD_VALIDATORS = []
 
 AUTH_VALIDATION_QUEUE = os.environ.get("AUTH_VALIDATION_QUEUE", "auth_validation_rpc")
 TEAM_RPC_QUEUE=os.environ.get("TEAM_RPC_QUEUE","team_rpc")
+TASK_RPC_QUEUE = os.environ.get("TASK_RPC_QUEUE", "task_rpc_queue")
+TASK_RPC_WORKERS = int(os.environ.get("TASK_RPC_WORKERS", 4))
+TASK_RPC_PREFETCH = int(os.environ.get("TASK_RPC_PREFETCH", 8))
+
+# Seconds a user's team memberships snapshot answers role checks before it
+# is revalidated with team_service.
+TEAM_SNAPSHOT_TTL = int(os.environ.get("TEAM_SNAPSHOT_TTL", 5))
+# Seconds after which a snapshot is fetched in full even if team_service
+# keeps answering "unchanged", in case a version bump was lost.
+TEAM_SNAPSHOT_MAX_AGE = int(os.environ.get("TEAM_SNAPSHOT_MAX_AGE", 300))
+
+# Seconds other users' team roles (assignees, ...) are reused across requests.
+TEAM_ROLE_CACHE_TTL = int(os.environ.get("TEAM_ROLE_CACHE_TTL", 5))
+
+# Seconds assignee names shown on tasks are reused before asking team_service again.
+TEAM_MEMBER_NAME_TTL = int(os.environ.get("TEAM_MEMBER_NAME_TTL", 60))
+
+# Codec for outgoing RPC requests ("msgpack" or "json"); servers answer in kind.
+RPC_CODEC = os.environ.get("RPC_CODEC", "msgpack")
+
+# Set to auth_service's JWT signing key to verify access tokens locally.
+AUTH_JWT_SIGNING_KEY = os.environ.get("AUTH_JWT_SIGNING_KEY")
+AUTH_REVOCATION_REFRESH = int(os.environ.get("AUTH_REVOCATION_REFRESH", 30))
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -105,11 +128,11 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
-RABBITMQ_HOST = os.environ.get("RABBITMQ_HOST")
+RABBITMQ_HOST = os.environ.get("RABBITMQ_HOST", "rabbitmq")
 RABBITMQ_PORT = int(os.environ.get("RABBITMQ_PORT", 5672))
-RABBITMQ_USER = os.environ.get("RABBITMQ_USER")
-RABBITMQ_PASS = os.environ.get("RABBITMQ_PASS")
-RABBITMQ_VHOST = os.environ.get("RABBITMQ_VHOST")
+RABBITMQ_USER = os.environ.get("RABBITMQ_USER", "user")
+RABBITMQ_PASS = os.environ.get("RABBITMQ_PASS", "password")
+RABBITMQ_VHOST = os.environ.get("RABBITMQ_VHOST", "/")
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
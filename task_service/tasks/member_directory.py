@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+
+from .rpc_client import RPCError
+from .team_client import TeamRPCClient
+
+
+def display_name(profile):
+    if not profile:
+        return None
+    return profile.get("name") or profile.get("email") or None
+
+
+class MemberDirectory:
+    """
+    In-process cache of team members' display names.
+
+    names() answers a whole set of (team_id, user_id) pairs at once:
+    cached pairs locally, the rest with one get_member_profiles call per
+    team involved - one call for a task list, which always covers a
+    single team. Users who left the team are cached as None too.
+    """
+
+    def __init__(self, ttl=60, max_size=50000):
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (team_id, user_id) -> (stored_at, name)
+
+    def names(self, pairs):
+        """{(team_id, user_id): name or None}; pairs that couldn't be looked up map to None."""
+        pairs = {(int(team_id), int(user_id)) for team_id, user_id in pairs}
+        now = time.monotonic()
+
+        found = {}
+        with self._lock:
+            for pair in pairs:
+                entry = self._entries.get(pair)
+                if entry is not None and now - entry[0] < self.ttl:
+                    found[pair] = entry[1]
+
+        missing = defaultdict(list)
+        for team_id, user_id in pairs - found.keys():
+            missing[team_id].append(user_id)
+
+        for team_id, user_ids in missing.items():
+            try:
+                profiles = TeamRPCClient().get_member_profiles(team_id, user_ids)
+            except RPCError:
+                found.update(((team_id, user_id), None) for user_id in user_ids)
+                continue
+
+            fetched = {
+                (team_id, user_id): display_name(profiles.get(user_id))
+                for user_id in user_ids
+            }
+            found.update(fetched)
+            self._store(fetched)
+
+        return found
+
+    def _store(self, names):
+        now = time.monotonic()
+        with self._lock:
+            for pair, name in names.items():
+                self._entries[pair] = (now, name)
+                self._entries.move_to_end(pair)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+directory = MemberDirectory(ttl=getattr(settings, "TEAM_MEMBER_NAME_TTL", 60))
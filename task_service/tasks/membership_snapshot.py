@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .rpc_client import get_rpc_client, RPCError
+
+
+class MembershipSnapshots:
+    """
+    Every team role of a user, fetched with one get_user_memberships call.
+
+    A snapshot answers all role checks for that user locally for `ttl`
+    seconds. After that it is revalidated with its version stamp: team
+    service replies "unchanged" without touching its database unless the
+    user joined, left or was removed from a team in the meantime. A
+    snapshot older than `max_age` is fetched in full regardless, so a
+    stamp bump that never reached Redis can't keep it stale for longer.
+    """
+
+    def __init__(self, ttl=5, max_age=300, max_size=10000):
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_size = max_size
+
+        self._lock = threading.Lock()
+        # user_id -> (checked_at, loaded_at, version, {team_id: role})
+        self._entries = OrderedDict()
+
+    def roles(self, user_id, timeout=3):
+        """{team_id: role} for every team of the user. Raises RPCError."""
+        user_id = int(user_id)
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+
+        now = time.monotonic()
+        if entry is not None and now - entry[0] < self.ttl:
+            return entry[3]
+
+        payload = {"action": "get_user_memberships", "user_id": user_id}
+        if entry is not None and entry[2] is not None and now - entry[1] < self.max_age:
+            payload["version"] = entry[2]
+
+        data = get_rpc_client().call(
+            settings.TEAM_RPC_QUEUE,
+            payload,
+            timeout=timeout,
+            single_flight=True,
+        )
+        if not data.get("ok"):
+            raise RPCError(data.get("error", "get_user_memberships failed"))
+
+        if data.get("unchanged"):
+            loaded_at, roles = entry[1], entry[3]
+        else:
+            loaded_at, roles = now, {team_id: role for team_id, role in data["memberships"]}
+
+        with self._lock:
+            self._entries[user_id] = (time.monotonic(), loaded_at, data.get("version"), roles)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+        return roles
+
+    def peek(self, user_id):
+        """The user's {team_id: role} if a fresh snapshot is held, else None; never calls out."""
+        with self._lock:
+            entry = self._entries.get(int(user_id))
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            return entry[3]
+        return None
+
+    def role(self, user_id, team_id, timeout=3):
+        """The user's role in the team, or None if they are not a member."""
+        return self.roles(user_id, timeout=timeout).get(int(team_id))
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(int(user_id), None)
+
+
+snapshots = MembershipSnapshots(
+    ttl=getattr(settings, "TEAM_SNAPSHOT_TTL", 5),
+    max_age=getattr(settings, "TEAM_SNAPSHOT_MAX_AGE", 300),
+)
@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_task_priority_taskattachment_taskactivitylog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['team_id', 'id'], name='tasks_task_team_id_5a781e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['team_id', 'status', 'id'], name='tasks_task_team_id_eabbf6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['team_id', 'assigned_to', 'id'], name='tasks_task_team_id_c0589d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['team_id', 'due_date', 'id'], name='tasks_task_team_id_5005d7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['team_id', 'updated_at', 'id'], name='tasks_task_team_id_a21fda_idx'),
+        ),
+    ]
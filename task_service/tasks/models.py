@@ -26,6 +26,18 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of a team's board (tasks.pagination), by
+            # default order, per status column, per assignee and by the
+            # sortable dates.
+            models.Index(fields=["team_id", "id"]),
+            models.Index(fields=["team_id", "status", "id"]),
+            models.Index(fields=["team_id", "assigned_to", "id"]),
+            models.Index(fields=["team_id", "due_date", "id"]),
+            models.Index(fields=["team_id", "updated_at", "id"]),
+        ]
+
     def __str__(self):
         return self.title
 
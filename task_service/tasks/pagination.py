@@ -0,0 +1,184 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils.dateparse import parse_datetime
+
+from .models import Task
+
+DEFAULT_PER_PAGE = 25
+MAX_PER_PAGE = 100
+
+# sort key -> (field ordered on, nullable)
+SORTS = {
+    "id": ("id", False),
+    "updated_at": ("updated_at", False),
+    "due_date": ("due_date", True),
+    "priority": ("priority_rank", False),
+}
+DEFAULT_SORT = "-id"
+
+PRIORITY_RANK = Case(
+    *[When(priority=value, then=Value(rank)) for rank, (value, _) in enumerate(Task.PRIORITY_CHOICES)],
+    default=Value(-1),
+    output_field=IntegerField(),
+)
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+def _choices(params, name, choices):
+    raw = params.get(name)
+    if not raw:
+        return None
+    values = [value.strip() for value in raw.split(",") if value.strip()]
+    allowed = dict(choices)
+    for value in values:
+        if value not in allowed:
+            raise InvalidQuery(f"{name} must be one of {', '.join(allowed)}")
+    return values
+
+
+def _datetime(params, name):
+    raw = params.get(name)
+    if not raw:
+        return None
+    try:
+        value = parse_datetime(raw)
+    except ValueError:
+        value = None
+    if value is None:
+        raise InvalidQuery(f"{name} must be an ISO 8601 datetime")
+    return value
+
+
+def filter_tasks(queryset, params):
+    """
+    Apply the list filters: status and priority (comma-separated),
+    assigned_to, due_before/due_after and updated_since.
+    """
+    statuses = _choices(params, "status", Task.STATUS_CHOICES)
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+
+    priorities = _choices(params, "priority", Task.PRIORITY_CHOICES)
+    if priorities:
+        queryset = queryset.filter(priority__in=priorities)
+
+    assigned_to = params.get("assigned_to")
+    if assigned_to:
+        try:
+            queryset = queryset.filter(assigned_to=int(assigned_to))
+        except ValueError:
+            raise InvalidQuery("assigned_to must be an integer")
+
+    due_before = _datetime(params, "due_before")
+    if due_before:
+        queryset = queryset.filter(due_date__lt=due_before)
+
+    due_after = _datetime(params, "due_after")
+    if due_after:
+        queryset = queryset.filter(due_date__gte=due_after)
+
+    updated_since = _datetime(params, "updated_since")
+    if updated_since:
+        queryset = queryset.filter(updated_at__gte=updated_since)
+
+    return queryset
+
+
+def encode_cursor(sort, value, task_id):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, task_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, sort):
+    """(value, id) from a cursor made for `sort`; anything malformed is an InvalidQuery."""
+    try:
+        cursor_sort, value, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise InvalidQuery("Invalid cursor")
+
+    if cursor_sort != sort:
+        raise InvalidQuery("Cursor belongs to a different sort")
+    if type(task_id) is not int:
+        raise InvalidQuery("Invalid cursor")
+
+    field, nullable = SORTS[sort[1:] if sort.startswith("-") else sort]
+    if value is None:
+        if not nullable:
+            raise InvalidQuery("Invalid cursor")
+    elif field in ("id", "priority_rank"):
+        if type(value) is not int:
+            raise InvalidQuery("Invalid cursor")
+    else:
+        try:
+            value = parse_datetime(value) if isinstance(value, str) else None
+        except ValueError:
+            value = None
+        if value is None:
+            raise InvalidQuery("Invalid cursor")
+    return value, task_id
+
+
+def paginate_tasks(queryset, params):
+    """
+    Keyset pagination of tasks on (sort field, id).
+
+    `sort` is one of id, updated_at, due_date or priority, with a leading
+    "-" for descending; tasks without a due date come last either way.
+    Each page is one range scan of per_page + 1 rows on the matching
+    (team_id, field, id) index, however deep it is. Priority order is
+    computed, so it scans the filtered tasks instead. Returns
+    (rows, next_cursor); next_cursor is None on the last page.
+    """
+    try:
+        per_page = int(params.get("per_page", DEFAULT_PER_PAGE))
+    except ValueError:
+        raise InvalidQuery("per_page must be an integer")
+    if not 1 <= per_page <= MAX_PER_PAGE:
+        raise InvalidQuery(f"per_page must be between 1 and {MAX_PER_PAGE}")
+
+    sort = params.get("sort", DEFAULT_SORT)
+    descending = sort.startswith("-")
+    key = sort[1:] if descending else sort
+    if key not in SORTS:
+        raise InvalidQuery(f"sort must be one of {', '.join(SORTS)}, optionally prefixed with -")
+    field, nullable = SORTS[key]
+
+    if key == "priority":
+        queryset = queryset.annotate(priority_rank=PRIORITY_RANK)
+
+    after = "lt" if descending else "gt"
+    cursor = params.get("cursor")
+    if cursor:
+        value, task_id = decode_cursor(cursor, sort)
+
+        if field == "id":
+            queryset = queryset.filter(**{f"id__{after}": task_id})
+        elif value is None:
+            # Already past the dated tasks, into the trailing nulls.
+            queryset = queryset.filter(**{f"{field}__isnull": True, f"id__{after}": task_id})
+        else:
+            following = Q(**{f"{field}__{after}": value}) | Q(**{field: value, f"id__{after}": task_id})
+            if nullable:
+                following |= Q(**{f"{field}__isnull": True})
+            queryset = queryset.filter(following)
+
+    if field == "id":
+        ordering = ["-id" if descending else "id"]
+    else:
+        expression = F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True)
+        ordering = [expression, "-id" if descending else "id"]
+
+    rows = list(queryset.order_by(*ordering)[:per_page + 1])
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        return rows, encode_cursor(sort, getattr(last, field), last.id)
+    return rows, None
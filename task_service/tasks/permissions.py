@@ -1,6 +1,7 @@
 from rest_framework.permissions import BasePermission
 from rest_framework.exceptions import AuthenticationFailed
 from .rpc import AuthRPCClient
+from . import jwt_auth
 
 
 class IsAuthenticatedByAuthService(BasePermission):
@@ -20,13 +21,15 @@ class IsAuthenticatedByAuthService(BasePermission):
         if not token:
             raise AuthenticationFailed("Token missing")
 
-        auth_rpc = AuthRPCClient()
+        res = jwt_auth.verify_token(token)
 
-        try:
-            res = auth_rpc.validate_token(token)
-        except Exception:
-            
-            raise AuthenticationFailed("Auth service unavailable")
+        if res is None:
+            auth_rpc = AuthRPCClient()
+
+            try:
+                res = auth_rpc.validate_token(token)
+            except Exception:
+                raise AuthenticationFailed("Auth service unavailable")
 
         if not res or not res.get("ok"):
             raise AuthenticationFailed("Invalid or expired token")
@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .membership_snapshot import snapshots
+from .rpc_client import RPCError
+from .team_client import TeamRPCClient
+
+
+class RoleCache:
+    """
+    Short-lived {(team_id, user_id): role} cache for users other than the
+    requester, filled from bulk lookups. Only memberships are cached; a
+    "not a member" answer is always asked again.
+
+    Nothing tells task_service about membership changes, so a role
+    change or removal is seen once the entry is `ttl` seconds old.
+    """
+
+    def __init__(self, ttl=5, max_size=50000):
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (team_id, user_id) -> (stored_at, role)
+
+    def get_many(self, team_id, user_ids):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for user_id in user_ids:
+                entry = self._entries.get((team_id, user_id))
+                if entry is not None and now - entry[0] < self.ttl:
+                    found[user_id] = entry[1]
+        return found
+
+    def set_many(self, team_id, roles):
+        now = time.monotonic()
+        with self._lock:
+            for user_id, role in roles.items():
+                if role:
+                    self._entries[(team_id, user_id)] = (now, role)
+                    self._entries.move_to_end((team_id, user_id))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in list(self._entries):
+                if key[1] == user_id:
+                    del self._entries[key]
+
+
+role_cache = RoleCache(ttl=getattr(settings, "TEAM_ROLE_CACHE_TTL", 5))
+
+
+def invalidate_user(user_id):
+    """Forget everything cached about the user's roles in this process."""
+    user_id = int(user_id)
+    snapshots.invalidate(user_id)
+    role_cache.invalidate_user(user_id)
+
+
+class RoleResolver:
+    """
+    Team roles for one request.
+
+    Answers are memoised for the request, so repeated checks are free.
+    Cached answers come from the requester's membership snapshot and from
+    role_cache; everything else is fetched with at most one call, a
+    snapshot revalidation when only the requester is missing or one bulk
+    get_memberships for all missing users otherwise.
+
+    A "not a member" taken from a cache is checked again before the
+    request relies on it, so someone who just joined is never refused. A
+    removal or role change is not pushed to task_service; it shows up
+    once the cached answer expires, after TEAM_SNAPSHOT_TTL for the
+    requester and TEAM_ROLE_CACHE_TTL for other users.
+    """
+
+    def __init__(self, requester_id):
+        self.requester_id = int(requester_id)
+        self._memo = {}  # (team_id, user_id) -> role
+        self._fresh = set()  # (team_id, user_id) answered by team_service in this request
+
+    def role(self, user_id, team_id):
+        return self.roles(team_id, [user_id])[int(user_id)]
+
+    def roles(self, team_id, user_ids):
+        """{user_id: role or None} for users of one team; ids come back as ints."""
+        team_id = int(team_id)
+        user_ids = list(dict.fromkeys(int(user_id) for user_id in user_ids))
+
+        missing = [u for u in user_ids if (team_id, u) not in self._memo]
+        if missing:
+            self._resolve(team_id, missing)
+
+        unconfirmed = [
+            u for u in user_ids
+            if self._memo[(team_id, u)] is None and (team_id, u) not in self._fresh
+        ]
+        if unconfirmed:
+            if self.requester_id in unconfirmed:
+                invalidate_user(self.requester_id)
+            self._fetch(team_id, unconfirmed)
+
+        return {u: self._memo[(team_id, u)] for u in user_ids}
+
+    def _resolve(self, team_id, user_ids):
+        rest = list(user_ids)
+
+        if self.requester_id in rest:
+            snapshot = snapshots.peek(self.requester_id)
+            if snapshot is not None:
+                self._memo[(team_id, self.requester_id)] = snapshot.get(team_id)
+                rest.remove(self.requester_id)
+
+        cached = role_cache.get_many(team_id, [u for u in rest if u != self.requester_id])
+        for user_id, role in cached.items():
+            self._memo[(team_id, user_id)] = role
+        rest = [u for u in rest if u not in cached]
+
+        if rest:
+            self._fetch(team_id, rest)
+
+    def _fetch(self, team_id, user_ids):
+        self._fresh.update((team_id, u) for u in user_ids)
+
+        if user_ids == [self.requester_id]:
+            # Revalidates the whole snapshot, which later checks reuse.
+            try:
+                roles = {self.requester_id: snapshots.role(self.requester_id, team_id)}
+            except (RPCError, TypeError, ValueError):
+                roles = {self.requester_id: None}
+        else:
+            try:
+                roles = TeamRPCClient().get_roles(team_id, user_ids)
+            except RPCError:
+                roles = dict.fromkeys(user_ids)
+            else:
+                role_cache.set_many(team_id, {
+                    u: role for u, role in roles.items() if u != self.requester_id
+                })
+
+        for user_id in user_ids:
+            self._memo[(team_id, user_id)] = roles.get(user_id)
+
+
+def get_resolver(request):
+    """The request's RoleResolver, created on first use."""
+    resolver = getattr(request, "_role_resolver", None)
+    if resolver is None:
+        resolver = RoleResolver(request.auth_user["id"])
+        request._role_resolver = resolver
+    return resolver
@@ -0,0 +1,70 @@
+"""
+Payload codecs for RPC messages.
+
+A message names its codec in the AMQP content_type property. Clients
+encode requests with the codec configured by RPC_CODEC; servers decode
+whatever arrives and answer in the same codec, so a client that only
+speaks JSON (or sets no content_type at all) keeps getting JSON back.
+
+msgpack is optional: without it every message falls back to JSON.
+"""
+import functools
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+
+
+def _json_dumps(payload):
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+CODECS = {
+    JSON: (_json_dumps, json.loads),
+}
+
+if msgpack is not None:
+    CODECS[MSGPACK] = (
+        functools.partial(msgpack.packb, use_bin_type=True),
+        # Integer map keys (e.g. user ids) survive the round-trip.
+        functools.partial(msgpack.unpackb, raw=False, strict_map_key=False),
+    )
+
+NAMES = {
+    "json": JSON,
+    "msgpack": MSGPACK,
+}
+
+
+def content_type_for(name):
+    """The content type for a codec name, or JSON if it is not available."""
+    content_type = NAMES.get(name, JSON)
+    return content_type if content_type in CODECS else JSON
+
+
+def negotiate(content_type):
+    """The content type to answer a message of `content_type` with."""
+    return content_type if content_type in CODECS else JSON
+
+
+def encode(payload, content_type=JSON):
+    dumps, _ = CODECS[content_type]
+    return dumps(payload)
+
+
+def decode(body, content_type=None):
+    # Messages without a content_type predate the codec layer and are JSON.
+    if content_type is None:
+        content_type = JSON
+
+    codec = CODECS.get(content_type)
+    if codec is None:
+        raise ValueError(f"Unsupported content type: {content_type}")
+
+    _, loads = codec
+    return loads(body)
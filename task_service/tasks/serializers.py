@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from .models import Task, TaskAttachment, TaskActivityLog
-from .team_client import TeamRPCClient
+from .member_directory import directory
 
 class TaskAttachmentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,6 +16,16 @@ class TaskActivityLogSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at"]
 
 
+class TaskListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Look every assignee name up together before the tasks render.
+        tasks = list(data.all() if hasattr(data, "all") else data)
+        self.context["assignee_names"] = directory.names(
+            {(task.team_id, task.assigned_to) for task in tasks if task.assigned_to}
+        )
+        return super().to_representation(tasks)
+
+
 class TaskSerializer(serializers.ModelSerializer):
     attachments = TaskAttachmentSerializer(many=True, read_only=True)
     activity_logs = TaskActivityLogSerializer(many=True, read_only=True)
@@ -24,6 +34,7 @@ class TaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
         fields = "__all__"
+        list_serializer_class = TaskListSerializer
         read_only_fields = [
         "id",
         "team_id",
@@ -39,9 +50,8 @@ class TaskSerializer(serializers.ModelSerializer):
         if not obj.assigned_to:
             return None
 
-        client = TeamRPCClient()
-        try:
-            user = client.get_user(obj.assigned_to)
-            return user.get("full_name") or user.get("email")
-        except Exception:
-            return None
+        key = (obj.team_id, obj.assigned_to)
+        names = self.context.get("assignee_names")
+        if names is None or key not in names:
+            names = directory.names([key])
+        return names.get(key)
@@ -1,84 +1,61 @@
-import json
-import uuid
-import time
-import pika
 from django.conf import settings
 
+from .membership_snapshot import snapshots
+from .rpc_client import get_rpc_client, RPCError
+
 
 class TeamRPCClient:
     def __init__(self):
-        self.connection = None
-        self.channel = None
-        self.callback_queue = None
-        self.response = None
-        self.corr_id = None
-
-    def _connect(self):
-        params = pika.ConnectionParameters(
-            host=settings.RABBITMQ_HOST,
-            port=settings.RABBITMQ_PORT,
-            virtual_host=settings.RABBITMQ_VHOST,
-            credentials=pika.PlainCredentials(
-                settings.RABBITMQ_USER,
-                settings.RABBITMQ_PASS,
-            ),
-            heartbeat=30,
-            blocked_connection_timeout=10,
-        )
-
-        self.connection = pika.BlockingConnection(params)
-        self.channel = self.connection.channel()
-
-        result = self.channel.queue_declare(queue="", exclusive=True)
-        self.callback_queue = result.method.queue
-
-        self.channel.basic_consume(
-            queue=self.callback_queue,
-            on_message_callback=self._on_response,
-            auto_ack=True,
-        )
-
-    def _on_response(self, ch, method, props, body):
-        if self.corr_id == props.correlation_id:
-            self.response = body
+        self.rpc = get_rpc_client()
 
     def get_role(self, user_id, team_id, timeout=3):
         try:
-            self._connect()
-        except Exception:
+            return snapshots.role(user_id, team_id, timeout=timeout)
+        except (RPCError, TypeError, ValueError):
             return None
 
-        self.response = None
-        self.corr_id = str(uuid.uuid4())
-
-        payload = json.dumps({
-            "user_id": user_id,
-            "team_id": team_id,
-        })
-
-        try:
-            self.channel.basic_publish(
-                exchange="",
-                routing_key=settings.TEAM_RPC_QUEUE,
-                properties=pika.BasicProperties(
-                    reply_to=self.callback_queue,
-                    correlation_id=self.corr_id,
-                ),
-                body=payload,
-            )
-        except Exception:
-            return None
-
-        start = time.time()
-        while time.time() - start < timeout:
-            try:
-                self.connection.process_data_events(time_limit=0.1)
-                if self.response:
-                    data = json.loads(self.response.decode())
-                    if data.get("ok") and data.get("is_member"):
-                        return data.get("role")
-                    return None
-            except Exception:
-                break
+    def get_roles(self, team_id, user_ids, timeout=3):
+        """
+        Roles of several users in one team, in one round-trip.
+
+        Returns {user_id: role}, with None for non-members. Raises
+        RPCError if the team service can't answer.
+        """
+        user_ids = list(user_ids)
+        data = self.rpc.call(
+            settings.TEAM_RPC_QUEUE,
+            {
+                "action": "get_memberships",
+                "team_id": team_id,
+                "user_ids": user_ids,
+            },
+            timeout=timeout,
+            single_flight=True,
+        )
+        if not data.get("ok"):
+            raise RPCError(data.get("error", "get_memberships failed"))
+
+        return {
+            user_id: result.get("role") if result.get("is_member") else None
+            for user_id, result in zip(user_ids, data["results"])
+        }
+
+    def get_member_profiles(self, team_id, user_ids, timeout=3):
+        """
+        {user_id: {"name", "email", "avatar_url"}} for the users who are
+        members of the team, in one round-trip. Raises RPCError.
+        """
+        data = self.rpc.call(
+            settings.TEAM_RPC_QUEUE,
+            {
+                "action": "get_member_profiles",
+                "team_id": team_id,
+                "user_ids": list(user_ids),
+            },
+            timeout=timeout,
+            single_flight=True,
+        )
+        if not data.get("ok"):
+            raise RPCError(data.get("error", "get_member_profiles failed"))
 
-        return None
+        return {user_id: profile for user_id, profile in data["profiles"]}
@@ -13,8 +13,9 @@ from .serializers import (
     TaskAttachmentSerializer,
     TaskActivityLogSerializer,
 )
+from .pagination import InvalidQuery, filter_tasks, paginate_tasks
 from .permissions import IsAuthenticatedByAuthService
-from .team_client import TeamRPCClient
+from .roles import get_resolver
 
 
 # ---------- helpers ----------
@@ -28,14 +29,19 @@ def create_activity(task, actor_id, action, meta=None):
     )
 
 
-def get_team_role(user_id, team_id):
-    client = TeamRPCClient()
-    return client.get_role(user_id, team_id)
+def get_team_role(request, team_id):
+    """The requester's role in the team, memoised for the request."""
+    return get_resolver(request).role(request.auth_user["id"], team_id)
 
 
-def ensure_task_access(user, task):
-   
-    role = get_team_role(user["id"], task.team_id)
+def get_team_roles(request, team_id, user_ids):
+    """Roles of several users in the team, fetched together."""
+    return get_resolver(request).roles(team_id, user_ids)
+
+
+def ensure_task_access(request, task):
+    user = request.auth_user
+    role = get_team_role(request, task.team_id)
     if not role:
         return False
 
@@ -61,11 +67,16 @@ class CreateTaskView(APIView):
         if not assigned_to:
             return Response({"detail": "assigned_to required"}, status=400)
 
-        role = get_team_role(user["id"], team_id)
-        if role != "manager":
+        try:
+            team_id, assigned_to = int(team_id), int(assigned_to)
+        except (TypeError, ValueError):
+            return Response({"detail": "team_id and assigned_to must be integers"}, status=400)
+
+        roles = get_team_roles(request, team_id, [user["id"], assigned_to])
+        if roles[user["id"]] != "manager":
             return Response({"detail": "Only managers can create tasks"}, status=403)
 
-        if not get_team_role(assigned_to, team_id):
+        if not roles[assigned_to]:
             return Response({"detail": "Assignee not in team"}, status=400)
 
         serializer = TaskSerializer(data=request.data)
@@ -91,7 +102,12 @@ class ListTasksView(APIView):
         if not team_id:
             return Response({"detail": "team_id required"}, status=400)
 
-        role = get_team_role(user["id"], team_id)
+        try:
+            team_id = int(team_id)
+        except ValueError:
+            return Response({"detail": "team_id must be integer"}, status=400)
+
+        role = get_team_role(request, team_id)
         if not role:
             return Response({"detail": "Forbidden"}, status=403)
 
@@ -103,7 +119,16 @@ class ListTasksView(APIView):
                 assigned_to=user["id"],
             )
 
-        return Response(TaskSerializer(tasks, many=True).data)
+        tasks = tasks.prefetch_related("attachments", "activity_logs")
+        try:
+            tasks, next_cursor = paginate_tasks(filter_tasks(tasks, request.query_params), request.query_params)
+        except InvalidQuery as e:
+            return Response({"detail": str(e)}, status=400)
+
+        return Response({
+            "next_cursor": next_cursor,
+            "results": TaskSerializer(tasks, many=True).data,
+        })
 
 
 class TaskDetailView(APIView):
@@ -113,7 +138,7 @@ class TaskDetailView(APIView):
         user = request.auth_user
         task = get_object_or_404(Task, pk=pk)
 
-        if not ensure_task_access(user, task):
+        if not ensure_task_access(request, task):
             return Response({"detail": "Not your task"}, status=403)
 
         return Response(TaskSerializer(task).data)
@@ -122,7 +147,7 @@ class TaskDetailView(APIView):
         user = request.auth_user
         task = get_object_or_404(Task, pk=pk)
 
-        role = get_team_role(user["id"], task.team_id)
+        role = get_team_role(request, task.team_id)
         if role != "manager":
             return Response({"detail": "Only managers can update tasks"}, status=403)
 
@@ -137,7 +162,7 @@ class TaskDetailView(APIView):
         user = request.auth_user
         task = get_object_or_404(Task, pk=pk)
 
-        role = get_team_role(user["id"], task.team_id)
+        role = get_team_role(request, task.team_id)
         if role != "manager":
             return Response({"detail": "Only managers can delete"}, status=403)
 
@@ -152,15 +177,21 @@ class AssignTaskView(APIView):
         user = request.auth_user
         task = get_object_or_404(Task, pk=pk)
 
-        role = get_team_role(user["id"], task.team_id)
-        if role != "manager":
+        assignee = request.data.get("user_id")
+        if assignee:
+            try:
+                assignee = int(assignee)
+            except (TypeError, ValueError):
+                return Response({"detail": "user_id must be integer"}, status=400)
+
+        roles = get_team_roles(request, task.team_id, [user["id"]] + ([assignee] if assignee else []))
+        if roles[user["id"]] != "manager":
             return Response({"detail": "Only managers can assign"}, status=403)
 
-        assignee = request.data.get("user_id")
         if not assignee:
             return Response({"detail": "user_id required"}, status=400)
 
-        if not get_team_role(assignee, task.team_id):
+        if not roles[assignee]:
             return Response({"detail": "Assignee not in team"}, status=400)
 
         task.assigned_to = assignee
@@ -177,7 +208,7 @@ class ChangeStatusView(APIView):
         user = request.auth_user
         task = get_object_or_404(Task, pk=pk)
 
-        if not ensure_task_access(user, task):
+        if not ensure_task_access(request, task):
             return Response({"detail": "Not your task"}, status=403)
 
         status_val = request.data.get("status")
@@ -198,7 +229,7 @@ class PresignAttachmentView(APIView):
         user = request.auth_user
         task = get_object_or_404(Task, pk=pk)
 
-        if not ensure_task_access(user, task):
+        if not ensure_task_access(request, task):
             return Response({"detail": "Not your task"}, status=403)
 
         filename = request.data.get("filename")
@@ -224,7 +255,7 @@ class ConfirmAttachmentView(APIView):
         user = request.auth_user
         task = get_object_or_404(Task, pk=pk)
 
-        if not ensure_task_access(user, task):
+        if not ensure_task_access(request, task):
             return Response({"detail": "Not your task"}, status=403)
 
         attachment = TaskAttachment.objects.create(
@@ -244,7 +275,7 @@ class TaskLogsView(APIView):
         user = request.auth_user
         task = get_object_or_404(Task, pk=pk)
 
-        if not ensure_task_access(user, task):
+        if not ensure_task_access(request, task):
             return Response({"detail": "Not your task"}, status=403)
 
         logs = task.activity_logs.order_by("-id")
@@ -0,0 +1,10 @@
+import os
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "team_service.settings")
+
+from django.conf import settings
+
+app = Celery("team_service", broker=settings.CELERY_BROKER_URL)
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
@@ -132,6 +132,30 @@ RABBITMQ_VHOST = os.environ.get("RABBITMQ_VHOST", "/")
 
 AUTH_VALIDATION_QUEUE = os.environ.get("AUTH_VALIDATION_QUEUE", "auth_validation_rpc")
 TEAM_RPC_QUEUE = os.environ.get("TEAM_RPC_QUEUE", "team_rpc")
+TEAM_RPC_WORKERS = int(os.environ.get("TEAM_RPC_WORKERS", 8))
+TEAM_RPC_PREFETCH = int(os.environ.get("TEAM_RPC_PREFETCH", 16))
+
+# Membership/role cache shared by the API and the RPC server.
+REDIS_URL = os.environ.get("REDIS_URL", "redis://redis:6379/2")
+TEAM_MEMBERSHIP_CACHE_TTL = int(os.environ.get("TEAM_MEMBERSHIP_CACHE_TTL", 300))
+# Longest a roster or team-list ETag stays valid, whatever its version stamps say.
+TEAM_ETAG_MAX_AGE = int(os.environ.get("TEAM_ETAG_MAX_AGE", 300))
+
+# auth_service broadcasts user changes on this fanout exchange; the RPC
+# worker copies profile edits onto TeamMember rows, batching the edits
+# that arrive within TEAM_PROFILE_SYNC_DELAY seconds.
+AUTH_USER_EVENTS_EXCHANGE = os.environ.get("AUTH_USER_EVENTS_EXCHANGE", "auth_user_events")
+TEAM_PROFILE_EVENTS_QUEUE = os.environ.get("TEAM_PROFILE_EVENTS_QUEUE", "team_profile_events")
+TEAM_PROFILE_SYNC_DELAY = float(os.environ.get("TEAM_PROFILE_SYNC_DELAY", 1.0))
+# Failed applies of one profile event before it is logged and dropped.
+TEAM_PROFILE_SYNC_MAX_ATTEMPTS = int(os.environ.get("TEAM_PROFILE_SYNC_MAX_ATTEMPTS", 5))
+
+# Codec for outgoing RPC requests ("msgpack" or "json"); servers answer in kind.
+RPC_CODEC = os.environ.get("RPC_CODEC", "msgpack")
+
+# Set to auth_service's JWT signing key to verify access tokens locally.
+AUTH_JWT_SIGNING_KEY = os.environ.get("AUTH_JWT_SIGNING_KEY")
+AUTH_REVOCATION_REFRESH = int(os.environ.get("AUTH_REVOCATION_REFRESH", 30))
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -164,10 +188,31 @@ CSRF_TRUSTED_ORIGINS = [
     "http://127.0.0.1:5173",
 ]
 
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
-EMAIL_HOST = "smtp.gmail.com"
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
+# Background jobs (invitation mail). Set CELERY_TASK_ALWAYS_EAGER=True to
+# run them inline, e.g. in tests.
+CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", "redis://redis:6379/3")
+CELERY_TASK_ALWAYS_EAGER = os.environ.get("CELERY_TASK_ALWAYS_EAGER", "False") == "True"
+CELERY_TASK_IGNORE_RESULT = True
+
+# Recipients per invitation job; each job sends over one SMTP connection.
+INVITE_BATCH_SIZE = int(os.environ.get("INVITE_BATCH_SIZE", 50))
+INVITE_MAX_RECIPIENTS = int(os.environ.get("INVITE_MAX_RECIPIENTS", 500))
+# Seconds an invitation may stay pending before inviting the address again
+# re-sends it, in case its job was lost.
+INVITE_PENDING_TTL = int(os.environ.get("INVITE_PENDING_TTL", 3600))
+
+# Rows resolved and inserted per transaction by the bulk member import.
+MEMBER_IMPORT_BATCH_SIZE = int(os.environ.get("MEMBER_IMPORT_BATCH_SIZE", 500))
+
+# Use django.core.mail.backends.console.EmailBackend or
+# django.core.mail.backends.filebased.EmailBackend (with EMAIL_FILE_PATH)
+# to keep mail local.
+EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
+EMAIL_FILE_PATH = os.environ.get("EMAIL_FILE_PATH", str(BASE_DIR / "sent_mail"))
+EMAIL_HOST = os.environ.get("EMAIL_HOST", "smtp.gmail.com")
+EMAIL_PORT = int(os.environ.get("EMAIL_PORT", 587))
+EMAIL_USE_TLS = os.environ.get("EMAIL_USE_TLS", "True") == "True"
+EMAIL_TIMEOUT = int(os.environ.get("EMAIL_TIMEOUT", 10))
 EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
@@ -1,61 +1,54 @@
-import json
-import pika
-import uuid
-import time
 from django.conf import settings
 
+from .rpc_client import get_rpc_client, CallBatcher, RPCError, RPCTimeout
 
-class AuthRPCClient:
-    def __init__(self):
-        self.connection = pika.BlockingConnection(
-            pika.ConnectionParameters(
-                host=settings.RABBITMQ_HOST,
-                port=settings.RABBITMQ_PORT,
-                virtual_host=settings.RABBITMQ_VHOST,
-                credentials=pika.PlainCredentials(
-                    settings.RABBITMQ_USER,
-                    settings.RABBITMQ_PASS,
-                ),
+
+def _validate_tokens(tokens, timeout):
+    rpc = get_rpc_client()
+
+    if len(tokens) == 1:
+        return [
+            rpc.call(
+                settings.AUTH_VALIDATION_QUEUE,
+                {"token": tokens[0]},
+                timeout=timeout,
+                single_flight=True,
             )
-        )
-        self.channel = self.connection.channel()
+        ]
 
-        result = self.channel.queue_declare(queue="", exclusive=True)
-        self.callback_queue = result.method.queue
+    res = rpc.call(
+        settings.AUTH_VALIDATION_QUEUE,
+        {"action": "validate_batch", "tokens": tokens},
+        timeout=timeout,
+    )
+    # validate_batch is only known to an upgraded auth_service, so roll it
+    # out before the clients; an older one answers it as an invalid token.
+    results = res.get("results") if res.get("ok") else None
+    if not isinstance(results, list):
+        raise RPCError(f"validate_batch failed: {res.get('error') or res.get('detail')}")
+    return results
 
-        self.response = None
-        self.corr_id = None
 
-        self.channel.basic_consume(
-            queue=self.callback_queue,
-            on_message_callback=self.on_response,
-            auto_ack=True,
-        )
+# Concurrent validations from different request threads share one message.
+token_batcher = CallBatcher(_validate_tokens)
 
-    def on_response(self, ch, method, props, body):
-        if self.corr_id == props.correlation_id:
-            self.response = body
 
+class AuthRPCClient:
     def validate_token(self, token, timeout=3):
-        self.response = None
-        self.corr_id = str(uuid.uuid4())
-
-        payload = json.dumps({"token": token})
-
-        self.channel.basic_publish(
-            exchange="",
-            routing_key=settings.AUTH_VALIDATION_QUEUE,
-            properties=pika.BasicProperties(
-                reply_to=self.callback_queue,
-                correlation_id=self.corr_id,
-            ),
-            body=payload,
+        try:
+            return token_batcher.submit(token, timeout=timeout)
+        except RPCTimeout:
+            return {"ok": False, "error": "auth_timeout"}
+        except RPCError:
+            return {"ok": False, "error": "auth_error"}
+
+    def get_users(self, emails=(), user_ids=(), timeout=10):
+        """Active users by email or id, as dicts; unknown ones are left out. Raises RPCError."""
+        res = get_rpc_client().call(
+            settings.AUTH_VALIDATION_QUEUE,
+            {"action": "get_users", "emails": list(emails), "user_ids": list(user_ids)},
+            timeout=timeout,
         )
-
-        start = time.time()
-        while time.time() - start < timeout:
-            self.connection.process_data_events(time_limit=0.1)
-            if self.response:
-                return json.loads(self.response.decode())
-
-        return {"ok": False, "error": "auth_timeout"}
+        if not res.get("ok"):
+            raise RPCError(res.get("error", "get_users failed"))
+        return res["users"]
@@ -0,0 +1,68 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Team, TeamMember
+
+
+def _delta(role, step):
+    changes = {"member_count": F("member_count") + step}
+    if role == TeamMember.ROLE_MANAGER:
+        changes["manager_count"] = F("manager_count") + step
+    return changes
+
+
+def member_added(team_id, role):
+    Team.objects.filter(id=team_id).update(**_delta(role, 1))
+
+
+def members_added(team_id, members, managers=0):
+    """member_added() for `members` new rows at once, `managers` of them managers."""
+    if members:
+        Team.objects.filter(id=team_id).update(
+            member_count=F("member_count") + members,
+            manager_count=F("manager_count") + managers,
+        )
+
+
+def member_removed(team_id, role, keep_manager=False):
+    """
+    Decrement the counters for a removed member. With keep_manager=True
+    removing a manager only succeeds while another one is left; returns
+    False otherwise so the caller can roll the removal back. The check
+    and the decrement are one UPDATE, so two managers leaving at once
+    can't both get through.
+    """
+    teams = Team.objects.filter(id=team_id)
+    if keep_manager and role == TeamMember.ROLE_MANAGER:
+        teams = teams.filter(manager_count__gt=1)
+    return teams.update(**_delta(role, -1)) > 0
+
+
+def role_changed(team_id, old_role, new_role, keep_manager=False):
+    """Move a member between roles; same keep_manager rule as member_removed."""
+    if old_role == new_role:
+        return True
+
+    teams = Team.objects.filter(id=team_id)
+    if new_role == TeamMember.ROLE_MANAGER:
+        return teams.update(manager_count=F("manager_count") + 1) > 0
+    if keep_manager:
+        teams = teams.filter(manager_count__gt=1)
+    return teams.update(manager_count=F("manager_count") - 1) > 0
+
+
+def actual_counts():
+    """Subqueries counting a team's member rows, usable in annotate()/update()."""
+    members = (
+        TeamMember.objects.filter(team=OuterRef("pk"))
+        .order_by()
+        .values("team")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    return {
+        "member_count": Coalesce(Subquery(members), 0),
+        "manager_count": Coalesce(
+            Subquery(members.filter(role=TeamMember.ROLE_MANAGER)), 0
+        ),
+    }
@@ -0,0 +1,34 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+# Tags looked at per request; clients normally send just one.
+MAX_CANDIDATES = 4
+
+
+def make_etag(*parts):
+    """
+    Strong ETag over JSON-able parts, typically version stamps plus query
+    params. It also covers the current TEAM_ETAG_MAX_AGE window, so even
+    a stamp that never changes can't answer 304s for longer than that.
+    """
+    window = int(time.time() // settings.TEAM_ETAG_MAX_AGE)
+    digest = hashlib.sha1(json.dumps([window, parts], sort_keys=True).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def request_etags(request):
+    return parse_etags(request.headers.get("If-None-Match", ""))[:MAX_CANDIDATES]
+
+
+def query_key(params, names):
+    """The query parameters that shape a response, in a stable order."""
+    return [[name, params.get(name, "")] for name in names]
+
+
+def not_modified(etag):
+    return Response(status=304, headers={"ETag": etag})
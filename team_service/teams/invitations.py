@@ -0,0 +1,94 @@
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .models import Invitation, TeamMember
+from .tasks import send_invitations
+
+logger = logging.getLogger("invitations")
+
+
+def _enqueue(ids):
+    # Runs after commit: a broker failure must not turn the request into a
+    # 500. The rows stay pending and are re-sent once INVITE_PENDING_TTL
+    # has passed.
+    try:
+        send_invitations.delay(ids)
+    except Exception as e:
+        logger.error(f"Could not queue {len(ids)} invitations: {e}")
+
+
+def queue_invitations(team, emails, invited_by):
+    """
+    Record an invitation per new recipient and hand them to the mail
+    worker in INVITE_BATCH_SIZE chunks once the rows are committed.
+
+    Addresses are normalised and deduplicated; invalid ones, current
+    members and recipients with an invitation still pending are skipped.
+    A pending invitation older than INVITE_PENDING_TTL is taken as lost:
+    it is marked failed and the address is invited again.
+    Returns (batch, results) where results has one {"email", "status"}
+    per distinct address, in request order.
+    """
+    results = {}
+    for email in emails:
+        email = str(email).strip().lower()
+        if email in results:
+            continue
+        try:
+            validate_email(email)
+        except ValidationError:
+            results[email] = "invalid"
+        else:
+            results[email] = None
+
+    candidates = [email for email, result in results.items() if result is None]
+    members = set(
+        TeamMember.objects.filter(team=team)
+        .annotate(email=Lower("user_email"))
+        .filter(email__in=candidates)
+        .values_list("email", flat=True)
+    )
+    pending = Invitation.objects.filter(
+        team=team,
+        email__in=candidates,
+        status=Invitation.STATUS_PENDING,
+    )
+    stale = pending.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=settings.INVITE_PENDING_TTL)
+    )
+    recent = set(pending.exclude(id__in=stale).values_list("email", flat=True))
+
+    batch = uuid.uuid4()
+    invitations = []
+    for email in candidates:
+        if email in members:
+            results[email] = "already_member"
+        elif email in recent:
+            results[email] = "already_pending"
+        else:
+            results[email] = Invitation.STATUS_PENDING
+            invitations.append(
+                Invitation(team=team, batch=batch, email=email, invited_by=invited_by)
+            )
+
+    with transaction.atomic():
+        stale.filter(email__in=[invitation.email for invitation in invitations]).update(
+            status=Invitation.STATUS_FAILED,
+            error="Still pending when invited again; superseded",
+        )
+        created = Invitation.objects.bulk_create(invitations)
+        ids = [invitation.id for invitation in created]
+        size = settings.INVITE_BATCH_SIZE
+        for start in range(0, len(ids), size):
+            chunk = ids[start:start + size]
+            transaction.on_commit(lambda chunk=chunk: _enqueue(chunk))
+
+    return batch, [{"email": email, "status": status} for email, status in results.items()]
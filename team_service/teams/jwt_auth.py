@@ -0,0 +1,165 @@
+"""
+Local verification of access tokens issued by auth_service.
+
+When AUTH_JWT_SIGNING_KEY is configured, the HS256 signature and expiry
+are checked in-process and the user comes from the claims auth_service
+embeds in the token, so no RPC round-trip is needed. Deleted and
+deactivated users are pulled from auth_service periodically as a small
+revocation list.
+
+verify_token returns None whenever it cannot decide locally (mode off,
+token issued without user claims, revocations never loaded or not
+refreshed for a few intervals); callers then fall back to RPC validation.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from .rpc_client import get_rpc_client, RPCError
+
+logger = logging.getLogger("jwt_auth")
+
+INVALID = {"ok": False, "detail": "invalid_or_expired_token"}
+
+
+def _b64decode(segment):
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+class RevocationList:
+    """
+    user_id -> revoked_at, refreshed from auth_service in the background.
+
+    The list only counts as loaded while its last successful refresh is
+    less than `max_missed` intervals old, so a worker cut off from
+    auth_service stops trusting it and validates over RPC again.
+    """
+
+    def __init__(self, refresh_interval, max_missed=3):
+        self.refresh_interval = refresh_interval
+        self.max_missed = max_missed
+        self.revoked = {}
+        self.refreshed_at = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            # Forked workers need their own refresh thread.
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run,
+                name="jwt-revocations",
+                daemon=True,
+            )
+            self._thread.start()
+
+    @property
+    def loaded(self):
+        refreshed_at = self.refreshed_at
+        return (
+            refreshed_at is not None
+            and time.monotonic() - refreshed_at < self.refresh_interval * self.max_missed
+        )
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                # A bad reply must not end the thread; the list goes stale instead.
+                logger.error(f"Token revocation refresh failed: {e}")
+            time.sleep(self.refresh_interval)
+
+    def refresh(self):
+        try:
+            res = get_rpc_client().call(
+                settings.AUTH_VALIDATION_QUEUE,
+                {"action": "get_revocations"},
+                timeout=5,
+            )
+        except RPCError as e:
+            logger.warning(f"Could not refresh token revocations: {e}")
+            return
+
+        if res.get("ok"):
+            self.revoked = {int(k): v for k, v in res["revoked"].items()}
+            self.refreshed_at = time.monotonic()
+
+    def is_revoked(self, user_id, issued_at):
+        revoked_at = self.revoked.get(user_id)
+        if revoked_at is None:
+            return False
+        return issued_at is None or issued_at <= revoked_at
+
+
+revocations = RevocationList(
+    refresh_interval=getattr(settings, "AUTH_REVOCATION_REFRESH", 30),
+)
+
+
+def verify_token(token):
+    key = getattr(settings, "AUTH_JWT_SIGNING_KEY", None)
+    if not key:
+        return None
+
+    revocations.start()
+    if not revocations.loaded:
+        return None
+
+    try:
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        header = json.loads(_b64decode(header_b64))
+        payload = json.loads(_b64decode(payload_b64))
+        signature = _b64decode(signature_b64)
+    except (ValueError, TypeError):
+        return INVALID
+
+    if not isinstance(header, dict) or not isinstance(payload, dict):
+        return INVALID
+
+    if header.get("alg") != "HS256":
+        return INVALID
+
+    expected = hmac.new(
+        key.encode(),
+        f"{header_b64}.{payload_b64}".encode(),
+        hashlib.sha256,
+    ).digest()
+    if not hmac.compare_digest(expected, signature):
+        return INVALID
+
+    if payload.get("token_type") != "access":
+        return INVALID
+
+    exp = payload.get("exp")
+    if not isinstance(exp, (int, float)) or exp <= time.time():
+        return INVALID
+
+    user_id = payload.get("user_id")
+    if user_id is None or "email" not in payload:
+        # Issued before auth_service embedded user claims.
+        return None
+
+    if revocations.is_revoked(user_id, payload.get("iat")):
+        return INVALID
+
+    return {
+        "ok": True,
+        "user": {
+            "id": user_id,
+            "email": payload["email"],
+            "full_name": payload.get("full_name", ""),
+            "email_verified": payload.get("email_verified", False),
+        },
+    }
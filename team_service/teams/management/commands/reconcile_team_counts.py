@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from teams.counters import actual_counts
+from teams.models import Team
+
+
+class Command(BaseCommand):
+    help = "Recompute Team.member_count/manager_count where they drifted from the member rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, batch_size, dry_run, **kwargs):
+        counts = actual_counts()
+        drifted = list(
+            Team.objects.annotate(
+                actual_members=counts["member_count"],
+                actual_managers=counts["manager_count"],
+            )
+            .filter(
+                ~Q(member_count=F("actual_members")) | ~Q(manager_count=F("actual_managers"))
+            )
+            .values_list("id", flat=True)
+        )
+
+        if not dry_run:
+            for start in range(0, len(drifted), batch_size):
+                Team.objects.filter(id__in=drifted[start:start + batch_size]).update(**counts)
+
+        verb = "Would repair" if dry_run else "Repaired"
+        self.stdout.write(f"{verb} counts for {len(drifted)} teams")
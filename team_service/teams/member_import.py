@@ -0,0 +1,190 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+from django.db import transaction
+
+from .auth_rpc_client import AuthRPCClient
+from .counters import members_added
+from .membership_cache import membership_cache
+from .models import TeamMember
+
+FORMATS = ("csv", "ndjson")
+
+# Per-line problems kept in the summary; the rest are only counted.
+MAX_ERRORS = 20
+
+ROLES = (TeamMember.ROLE_MEMBER, TeamMember.ROLE_MANAGER)
+
+
+class MemberImportFailed(Exception):
+    def __init__(self, message, summary):
+        super().__init__(message)
+        self.summary = summary
+
+
+def detect_format(filename, requested=None):
+    if requested:
+        return requested if requested in FORMATS else None
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+def read_rows(upload, fmt):
+    """Yield (line, row dict) from an uploaded file without reading it all into memory."""
+    text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {(key or "").strip().lower(): value for key, value in row.items()}
+        return
+
+    for line, raw in enumerate(text, 1):
+        if not raw.strip():
+            continue
+        try:
+            row = json.loads(raw)
+        except ValueError:
+            row = None
+        yield line, row if isinstance(row, dict) else None
+
+
+def _parse(row):
+    """(email, user_id, role) for a row, or raise ValueError."""
+    if row is None:
+        raise ValueError("not an object")
+
+    email = str(row.get("email") or "").strip().lower()
+    user_id = row.get("user_id")
+    user_id = int(user_id) if user_id not in (None, "") else None
+    if not email and user_id is None:
+        raise ValueError("email or user_id required")
+
+    role = str(row.get("role") or TeamMember.ROLE_MEMBER).strip().lower()
+    if role not in ROLES:
+        raise ValueError(f"unknown role {role!r}")
+
+    return email, user_id, role
+
+
+class MemberImport:
+    """
+    Adds the users listed in an upload to a team, batch_size rows at a time.
+
+    Each batch costs one get_users call to auth_service, one query for
+    existing memberships and one bulk insert in its own transaction, so
+    memory stays flat however long the file is. Batches that finished
+    stay imported if a later one fails; importing the same file again
+    only adds the rows that are still missing.
+    """
+
+    def __init__(self, team, batch_size=500, auth=None):
+        self.team = team
+        self.batch_size = batch_size
+        self.auth = auth or AuthRPCClient()
+        self.summary = {
+            "rows": 0,
+            "created": 0,
+            "already_member": 0,
+            "duplicate": 0,
+            "unknown_user": 0,
+            "invalid": 0,
+            "errors": [],
+        }
+
+    def _error(self, line, kind, message):
+        self.summary[kind] += 1
+        if len(self.summary["errors"]) < MAX_ERRORS:
+            self.summary["errors"].append({"line": line, "error": message})
+
+    def run(self, rows):
+        batch = []
+        for line, row in rows:
+            self.summary["rows"] += 1
+            try:
+                batch.append((line, *_parse(row)))
+            except (TypeError, ValueError) as e:
+                self._error(line, "invalid", str(e))
+                continue
+
+            if len(batch) >= self.batch_size:
+                self._import(batch)
+                batch = []
+
+        if batch:
+            self._import(batch)
+        return self.summary
+
+    def _import(self, batch):
+        try:
+            users = self.auth.get_users(
+                emails={email for _, email, _, _ in batch if email},
+                user_ids={user_id for _, _, user_id, _ in batch if user_id is not None},
+            )
+        except Exception as e:
+            raise MemberImportFailed(f"User lookup failed at line {batch[0][0]}: {e}", self.summary)
+
+        by_email = {user["email"].lower(): user for user in users}
+        by_id = {user["id"]: user for user in users}
+
+        wanted = {}  # user_id -> (user, role), first row wins
+        for line, email, user_id, role in batch:
+            user = by_id.get(user_id) if user_id is not None else by_email.get(email)
+            if user is None:
+                self._error(line, "unknown_user", f"no active user {email or user_id}")
+            elif user["id"] in wanted:
+                self.summary["duplicate"] += 1
+            else:
+                wanted[user["id"]] = (user, role)
+
+        existing = set(
+            TeamMember.objects.filter(team=self.team, user_id__in=wanted)
+            .values_list("user_id", flat=True)
+        )
+        self.summary["already_member"] += len(existing)
+
+        new = [
+            TeamMember(
+                team=self.team,
+                user_id=user_id,
+                user_name=user["full_name"],
+                user_email=user["email"],
+                avatar_url=user["avatar_url"],
+                profile_updated_at=datetime.fromtimestamp(user["updated_at"], tz=timezone.utc),
+                role=role,
+            )
+            for user_id, (user, role) in wanted.items()
+            if user_id not in existing
+        ]
+        if not new:
+            return
+
+        # ignore_conflicts skips users who joined since the query above, and
+        # their rows keep whatever role they joined with. bulk_create sets
+        # joined_at on each object it sends, so the rows that come back
+        # with our joined_at are the ones this insert wrote.
+        with transaction.atomic():
+            TeamMember.objects.bulk_create(new, ignore_conflicts=True)
+            sent = {member.user_id: member.joined_at for member in new}
+            inserted = {
+                user_id: role
+                for user_id, role, joined_at in TeamMember.objects.filter(
+                    team=self.team, user_id__in=sent
+                ).values_list("user_id", "role", "joined_at")
+                if joined_at == sent[user_id]
+            }
+            members_added(
+                self.team.id,
+                len(inserted),
+                sum(1 for role in inserted.values() if role == TeamMember.ROLE_MANAGER),
+            )
+
+        self.summary["created"] += len(inserted)
+        self.summary["already_member"] += len(new) - len(inserted)
+        membership_cache.update_many(self.team.id, inserted)
@@ -0,0 +1,263 @@
+import json
+import logging
+import threading
+import time
+import uuid
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger("membership_cache")
+
+# Stored for users who are not in the team, so misses are cached too.
+NOT_MEMBER = "-"
+
+# Version stamps only need to outlive the snapshots and ETags holding them.
+VERSION_TTL = 7 * 24 * 3600
+ETAG_TTL = 24 * 3600
+
+
+class MembershipCache:
+    """
+    Redis cache of team roles keyed by (team_id, user_id), plus version
+    stamps that change whenever a user's memberships change (per user)
+    or a team's roster or counts change (per team).
+
+    The RPC server fills it after a DB lookup with SET NX, and the views
+    that change membership overwrite the entry with the new role right
+    after their write. A fill racing with a membership change therefore
+    never replaces the fresher value written by the view.
+
+    Redis errors are logged and treated as misses, so a Redis outage
+    falls back to the database instead of failing the lookup. After an
+    error Redis is skipped for `retry_after` seconds so an unreachable
+    server doesn't add a connect timeout to every call. The keys of a
+    change that failed or was skipped meanwhile are remembered, and the
+    first call that finds Redis back deletes them before anything else:
+    the role entry is refilled from the database and the version stamps
+    are recreated, so no snapshot or ETag taken before the change still
+    matches. That only covers this process; one that dies holding such
+    keys leaves them to the callers' own maximum ages.
+    """
+
+    def __init__(self, client, ttl=300, retry_after=5):
+        self.client = client
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._down_until = 0.0
+
+        self._lock = threading.Lock()
+        self._dirty = set()  # keys of changes Redis never got
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(team_id, user_id):
+        return f"team:member:{int(team_id)}:{int(user_id)}"
+
+    @staticmethod
+    def user_version_key(user_id):
+        return f"team:user_version:{int(user_id)}"
+
+    @staticmethod
+    def team_version_key(team_id):
+        return f"team:team_version:{int(team_id)}"
+
+    @staticmethod
+    def etag_key(etag):
+        return f"team:etag:{etag}"
+
+    def _available(self):
+        if time.monotonic() < self._down_until:
+            return False
+
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return True
+
+        try:
+            self.client.delete(*dirty)
+        except redis.RedisError as e:
+            self._lost(dirty)
+            self._failed("repair", e)
+            return False
+        logger.info(f"Membership cache dropped {len(dirty)} keys changed while it was unavailable")
+        return True
+
+    def _failed(self, operation, error):
+        self._down_until = time.monotonic() + self.retry_after
+        logger.warning(f"Membership cache {operation} failed: {error}")
+
+    def _lost(self, keys):
+        """Remember keys whose change didn't reach Redis, for _available() to drop."""
+        with self._lock:
+            self._dirty.update(keys)
+
+    def _change_keys(self, team_id, user_ids):
+        keys = [self.team_version_key(team_id)]
+        for user_id in user_ids:
+            keys += [self.key_for(team_id, user_id), self.user_version_key(user_id)]
+        return keys
+
+    def get_many(self, pairs):
+        """Return {(user_id, team_id): role} for the cached pairs; role is None for non-members."""
+        values = [None] * len(pairs)
+        if self._available() and pairs:
+            try:
+                values = self.client.mget([self.key_for(team_id, user_id) for user_id, team_id in pairs])
+            except redis.RedisError as e:
+                self._failed("read", e)
+
+        found = {
+            pair: None if value == NOT_MEMBER else value
+            for pair, value in zip(pairs, values)
+            if value is not None
+        }
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(pairs) - len(found)
+
+        return found
+
+    def fill_many(self, roles):
+        """Cache {(user_id, team_id): role} looked up from the DB, keeping newer entries."""
+        if not self._available() or not roles:
+            return
+
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for (user_id, team_id), role in roles.items():
+                pipe.set(self.key_for(team_id, user_id), role or NOT_MEMBER, ex=self.ttl, nx=True)
+            pipe.execute()
+        except redis.RedisError as e:
+            self._failed("write", e)
+
+    def update(self, team_id, user_id, role):
+        """Record a membership change; role=None means the user left."""
+        if not self._available():
+            self._lost(self._change_keys(team_id, [user_id]))
+            return
+
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.set(self.key_for(team_id, user_id), role or NOT_MEMBER, ex=self.ttl)
+            pipe.set(self.user_version_key(user_id), uuid.uuid4().hex, ex=VERSION_TTL)
+            pipe.set(self.team_version_key(team_id), uuid.uuid4().hex, ex=VERSION_TTL)
+            pipe.execute()
+        except redis.RedisError as e:
+            self._lost(self._change_keys(team_id, [user_id]))
+            self._failed("write", e)
+
+    def update_many(self, team_id, roles):
+        """update() for {user_id: role} of one team, in one round trip."""
+        if not roles:
+            return
+        if not self._available():
+            self._lost(self._change_keys(team_id, roles))
+            return
+
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for user_id, role in roles.items():
+                pipe.set(self.key_for(team_id, user_id), role or NOT_MEMBER, ex=self.ttl)
+                pipe.set(self.user_version_key(user_id), uuid.uuid4().hex, ex=VERSION_TTL)
+            pipe.set(self.team_version_key(team_id), uuid.uuid4().hex, ex=VERSION_TTL)
+            pipe.execute()
+        except redis.RedisError as e:
+            self._lost(self._change_keys(team_id, roles))
+            self._failed("write", e)
+
+    def touch_teams(self, team_ids):
+        """New version stamps for teams whose rosters changed without a membership change."""
+        if not team_ids:
+            return
+        if not self._available():
+            self._lost(self.team_version_key(team_id) for team_id in team_ids)
+            return
+
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for team_id in team_ids:
+                pipe.set(self.team_version_key(team_id), uuid.uuid4().hex, ex=VERSION_TTL)
+            pipe.execute()
+        except redis.RedisError as e:
+            self._lost(self.team_version_key(team_id) for team_id in team_ids)
+            self._failed("write", e)
+
+    def _versions(self, keys):
+        """Current stamps for version keys, creating missing ones; None when Redis is unavailable."""
+        if not self._available():
+            return None
+        if not keys:
+            return []
+
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key in keys:
+                pipe.set(key, uuid.uuid4().hex, ex=VERSION_TTL, nx=True)
+            pipe.mget(keys)
+            return pipe.execute()[-1]
+        except redis.RedisError as e:
+            self._failed("read", e)
+            return None
+
+    def user_version(self, user_id):
+        """
+        Opaque stamp for the user's current memberships, or None when Redis
+        is unavailable. Stamps are random rather than counters so one that
+        expired and was recreated can never match a stale snapshot.
+        """
+        versions = self._versions([self.user_version_key(user_id)])
+        return versions[0] if versions else None
+
+    def team_version(self, team_id):
+        """Like user_version(), for a team's roster and counts."""
+        versions = self._versions([self.team_version_key(team_id)])
+        return versions[0] if versions else None
+
+    def team_versions(self, team_ids):
+        """[team_version(id) for id in team_ids] in one round trip, or None."""
+        return self._versions([self.team_version_key(team_id) for team_id in team_ids])
+
+    def remember_etag(self, etag, data):
+        """Keep JSON-able data needed to revalidate an ETag later."""
+        if not self._available():
+            return
+
+        try:
+            self.client.set(self.etag_key(etag), json.dumps(data), ex=ETAG_TTL)
+        except redis.RedisError as e:
+            self._failed("write", e)
+
+    def etag_data(self, etag):
+        if not self._available():
+            return None
+
+        try:
+            data = self.client.get(self.etag_key(etag))
+        except redis.RedisError as e:
+            self._failed("read", e)
+            return None
+        return json.loads(data) if data is not None else None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+membership_cache = MembershipCache(
+    redis.StrictRedis.from_url(
+        settings.REDIS_URL,
+        decode_responses=True,
+        socket_timeout=0.5,
+        socket_connect_timeout=0.5,
+    ),
+    ttl=settings.TEAM_MEMBERSHIP_CACHE_TTL,
+)
@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0002_teammember_avatar_url_teammember_user_email_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='teammember',
+            name='teams_teamm_user_id_08f226_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='teammember',
+            name='teams_teamm_team_id_015042_idx',
+        ),
+        migrations.AddIndex(
+            model_name='teammember',
+            index=models.Index(fields=['user_id', 'joined_at', 'id'], name='teams_teamm_user_id_661665_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teammember',
+            index=models.Index(fields=['team', 'joined_at', 'id'], name='teams_teamm_team_id_be63d3_idx'),
+        ),
+    ]
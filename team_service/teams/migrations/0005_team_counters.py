@@ -0,0 +1,43 @@
+# Generated by Django 4.2 on 2026-10-18 15:13
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counts(apps, schema_editor):
+    Team = apps.get_model("teams", "Team")
+    TeamMember = apps.get_model("teams", "TeamMember")
+
+    members = (
+        TeamMember.objects.filter(team=OuterRef("pk"))
+        .order_by()
+        .values("team")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    Team.objects.update(
+        member_count=Coalesce(Subquery(members), 0),
+        manager_count=Coalesce(Subquery(members.filter(role="manager")), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0004_invitation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='manager_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+# Trigram indexes for member search. The expressions match the SQL Django
+# emits for icontains on Postgres (UPPER(col::text) LIKE UPPER(%s)), so
+# the planner can use them for the search endpoint's filters. Other
+# backends fall back to teams.search.MemberIndex and get no index.
+INDEXES = {
+    "teams_teammember_name_trgm": "user_name",
+    "teams_teammember_email_trgm": "user_email",
+}
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, column in INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON teams_teammember "
+            f"USING gin (UPPER({column}::text) gin_trgm_ops)"
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    for name in INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0005_team_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 15:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0006_teammember_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teammember',
+            name='profile_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
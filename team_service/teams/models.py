@@ -6,6 +6,11 @@ class Team(models.Model):
     created_by = models.IntegerField() 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Kept in step with TeamMember rows by teams.counters; repaired by
+    # the reconcile_team_counts command if they ever drift.
+    member_count = models.PositiveIntegerField(default=0)
+    manager_count = models.PositiveIntegerField(default=0)
+
     def __str__(self):
         return self.name
 
@@ -23,6 +28,9 @@ class TeamMember(models.Model):
     user_name = models.CharField(max_length=255, blank=True, default="")
     user_email = models.EmailField(blank=True, default="")
     avatar_url = models.CharField(max_length=1000, blank=True, default="")
+    # auth_service's updated_at for the profile fields above, so profile
+    # events applied out of order can't overwrite newer data.
+    profile_updated_at = models.DateTimeField(null=True, blank=True)
 
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default=ROLE_MEMBER)
     joined_at = models.DateTimeField(auto_now_add=True)
@@ -30,9 +38,34 @@ class TeamMember(models.Model):
     class Meta:
         unique_together = ("team", "user_id")
         indexes = [
-            models.Index(fields=["user_id"]),
-            models.Index(fields=["team"]),
+            # Keyset pagination of a user's teams and a team's members.
+            models.Index(fields=["user_id", "joined_at", "id"]),
+            models.Index(fields=["team", "joined_at", "id"]),
         ]
 
     def __str__(self):
         return f"{self.user_name or self.user_id} in {self.team.name}"
+
+
+class Invitation(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+    )
+
+    team = models.ForeignKey(Team, related_name="invitations", on_delete=models.CASCADE)
+    batch = models.UUIDField(db_index=True)
+    email = models.EmailField()
+    invited_by = models.IntegerField()
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    error = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.email} to {self.team.name} ({self.status})"
@@ -0,0 +1,73 @@
+import base64
+import json
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db.models import Q
+
+DEFAULT_PER_PAGE = 25
+MAX_PER_PAGE = 100
+COUNT_CACHE_TTL = 60
+
+
+class InvalidPage(ValueError):
+    pass
+
+
+def encode_cursor(member):
+    raw = json.dumps([member.joined_at.isoformat(), member.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        joined_at, member_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(joined_at), int(member_id)
+    except (ValueError, TypeError):
+        raise InvalidPage("Invalid cursor")
+
+
+def paginate_members(queryset, params, default_per_page=DEFAULT_PER_PAGE):
+    """
+    Keyset pagination of TeamMember rows, newest first.
+
+    Rows are ordered on (joined_at, id) descending and the cursor carries
+    the last row's pair, so every page is one index range scan of
+    per_page + 1 rows no matter how deep it is. Returns (rows, next_cursor);
+    next_cursor is None on the last page.
+    """
+    try:
+        per_page = int(params.get("per_page", default_per_page))
+    except ValueError:
+        raise InvalidPage("per_page must be an integer")
+    if not 1 <= per_page <= MAX_PER_PAGE:
+        raise InvalidPage(f"per_page must be between 1 and {MAX_PER_PAGE}")
+
+    cursor = params.get("cursor")
+    if cursor:
+        joined_at, member_id = decode_cursor(cursor)
+        # (joined_at, id) < cursor, with joined_at <= spelled out so the
+        # planner gets an index range bound rather than just an OR.
+        queryset = queryset.filter(
+            Q(joined_at__lte=joined_at),
+            Q(joined_at__lt=joined_at) | Q(id__lt=member_id),
+        )
+
+    rows = list(queryset.order_by("-joined_at", "-id")[:per_page + 1])
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+
+def cached_count(key, queryset):
+    """COUNT(*) for `queryset`, cached for COUNT_CACHE_TTL seconds."""
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_TTL)
+    return count
+
+
+def wants_count(params):
+    return params.get("count", "").lower() in ("1", "true", "yes")
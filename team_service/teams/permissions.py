@@ -2,6 +2,7 @@ from rest_framework.permissions import BasePermission
 from rest_framework.response import Response
 from rest_framework import status
 from .auth_rpc_client import AuthRPCClient
+from . import jwt_auth
 
 
 class IsAuthenticatedByAuthService(BasePermission):
@@ -14,8 +15,11 @@ class IsAuthenticatedByAuthService(BasePermission):
 
         token = auth.split(" ", 1)[1]
 
-        auth_rpc = AuthRPCClient()
-        res = auth_rpc.validate_token(token)
+        res = jwt_auth.verify_token(token)
+
+        if res is None:
+            auth_rpc = AuthRPCClient()
+            res = auth_rpc.validate_token(token)
 
         if not res.get("ok"):
             return False
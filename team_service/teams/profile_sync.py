@@ -0,0 +1,174 @@
+import logging
+import threading
+from datetime import datetime, timezone
+
+from django.db import InterfaceError, OperationalError, close_old_connections
+from django.db.models import Q
+
+from .membership_cache import membership_cache
+from .models import TeamMember
+
+logger = logging.getLogger("profile_sync")
+
+# Errors that say the database is unreachable rather than that the event is
+# bad; they requeue without counting as an attempt.
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+# Failing profiles whose attempts are counted; events that were consumed
+# elsewhere leave entries behind, so the table is reset when it fills up.
+MAX_TRACKED = 10000
+
+
+def apply_profile(user_id, updated_at, profile):
+    """
+    Copy a profile onto the user's member rows; returns the rows written.
+
+    Rows that already hold a newer profile are skipped, and so are rows
+    whose fields all match already: saves that leave the profile alone
+    (last_login, ...) write nothing and touch no roster.
+    """
+    fields = {
+        "user_name": profile.get("full_name", ""),
+        "user_email": profile.get("email", ""),
+        "avatar_url": profile.get("avatar_url", ""),
+    }
+    return TeamMember.objects.filter(user_id=user_id).filter(
+        Q(profile_updated_at__isnull=True) | Q(profile_updated_at__lt=updated_at)
+    ).exclude(**fields).update(profile_updated_at=updated_at, **fields)
+
+
+class ProfileSync:
+    """
+    Copies auth_service profile changes onto the user's TeamMember rows.
+
+    Events are buffered for `delay` seconds and only the newest profile
+    per user is kept, so a burst of edits costs one UPDATE per user
+    covering all of their memberships. The UPDATE skips rows that already
+    hold a newer profile, which makes redelivered or reordered events
+    harmless.
+
+    add() takes a settle(ok) callback per event; it is called after the
+    flush with the outcome for that event's user alone, so one user's
+    failure never holds back the others. A failed event is requeued
+    until its profile has failed `max_attempts` times, then logged and
+    acked so it can't block the queue; losing the database only
+    requeues and never counts against that limit.
+    """
+
+    def __init__(self, delay=1.0, max_attempts=5):
+        self.delay = delay
+        self.max_attempts = max_attempts
+
+        self._lock = threading.Lock()
+        self._pending = {}  # user_id -> (updated_at, profile, [settle])
+        self._attempts = {}  # (user_id, updated_at) -> failures so far
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.applied = 0
+        self.rows = 0
+        self.dropped = 0
+
+    def add(self, user_id, updated_at, profile, settle=None):
+        updated_at = datetime.fromtimestamp(updated_at, tz=timezone.utc)
+
+        with self._lock:
+            current = self._pending.get(user_id)
+            settles = current[2] if current is not None else []
+            if settle is not None:
+                settles.append(settle)
+            if current is None or current[0] < updated_at:
+                self._pending[user_id] = (updated_at, profile, settles)
+
+    def _give_up(self, user_id, updated_at, error):
+        """Count a failed attempt; True once the profile has used them all."""
+        key = (user_id, updated_at)
+        with self._lock:
+            attempts = self._attempts.pop(key, 0) + 1
+            if attempts < self.max_attempts:
+                if len(self._attempts) >= MAX_TRACKED:
+                    self._attempts.clear()
+                self._attempts[key] = attempts
+                return False
+            self.dropped += 1
+
+        logger.error(
+            f"Dropping profile event for user {user_id} ({updated_at.isoformat()}) "
+            f"after {attempts} attempts: {error}"
+        )
+        return True
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        applied = 0
+        rows = 0
+        changed = []
+        outcomes = []  # (settles, ok)
+        close_old_connections()
+        try:
+            for user_id, (updated_at, profile, settles) in pending.items():
+                try:
+                    updated = apply_profile(user_id, updated_at, profile)
+                except TRANSIENT_ERRORS as e:
+                    logger.error(f"Profile sync of user {user_id} failed, will retry: {e}")
+                    outcomes.append((settles, False))
+                    continue
+                except Exception as e:
+                    # Acking a dropped event is what stops its redelivery.
+                    outcomes.append((settles, self._give_up(user_id, updated_at, e)))
+                    continue
+
+                with self._lock:
+                    self._attempts.pop((user_id, updated_at), None)
+                outcomes.append((settles, True))
+                applied += 1
+                if updated:
+                    rows += updated
+                    changed.append(user_id)
+
+            # Rosters showing these users changed; invalidate their ETags.
+            # The rows are already written, so a failure here is not worth
+            # a redelivery; the ETags then age out on their own.
+            if changed:
+                try:
+                    membership_cache.touch_teams(set(
+                        TeamMember.objects.filter(user_id__in=changed)
+                        .values_list("team_id", flat=True)
+                    ))
+                except Exception as e:
+                    logger.error(f"Could not touch the teams of {len(changed)} synced users: {e}")
+        finally:
+            close_old_connections()
+
+        with self._lock:
+            self.applied += applied
+            self.rows += rows
+
+        for settles, ok in outcomes:
+            for settle in settles:
+                settle(ok)
+
+    def _run(self):
+        while not self._stop.wait(self.delay):
+            self.flush()
+        self.flush()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profile_sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "applied": self.applied,
+                "rows": self.rows,
+                "dropped": self.dropped,
+            }
@@ -0,0 +1,380 @@
+"""
+Process-wide RabbitMQ RPC client.
+
+Every RPC helper in this service goes through one long-lived connection per
+process instead of opening its own. Replies come back on RabbitMQ's direct
+reply-to pseudo queue and are matched to the waiting caller by correlation
+id, so many threads can have calls in flight on the same connection.
+
+The connection is owned by a background I/O thread that blocks until the
+next frame arrives. Callers hand their publish to that thread and wait on a
+future, which the thread resolves the moment the matching reply is read.
+
+Requests are encoded with the client's codec (see rpc_codec) and each
+reply is decoded according to its own content_type.
+
+Every request carries the caller's deadline: the AMQP expiration lets the
+broker drop it while it is still queued, and the DEADLINE_HEADER (epoch
+seconds) lets the server skip it if it is dequeued too late.
+
+Idempotent lookups can opt into single-flight: concurrent calls with the
+same queue and payload share one request and its reply.
+
+`connect` opens the broker connection; by default a pika.BlockingConnection
+for `connection_params`, but anything with the same interface works (such
+as the in-memory broker in benchmarks/memory_broker.py).
+"""
+import functools
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import pika
+from pika.exceptions import AMQPError
+
+from . import rpc_codec
+
+logger = logging.getLogger("rpc_client")
+
+DIRECT_REPLY_TO = "amq.rabbitmq.reply-to"
+DEADLINE_HEADER = "x-deadline"
+
+
+class RPCError(Exception):
+    pass
+
+
+class RPCTimeout(RPCError, TimeoutError):
+    pass
+
+
+class RPCUnavailable(RPCError, ConnectionError):
+    pass
+
+
+class RPCClient:
+    def __init__(self, connection_params, reconnect_delay=1, max_reconnect_delay=30,
+                 content_type=rpc_codec.JSON, connect=None):
+        self.connection_params = connection_params
+        self.connect = connect or functools.partial(pika.BlockingConnection, connection_params)
+        self.content_type = content_type
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        # Only the I/O thread touches these; pika is not thread-safe.
+        self.connection = None
+        self.channel = None
+
+        self._connected = threading.Event()
+        self._closing = False
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        # Correlation id -> Future waiting for (content_type, reply body).
+        self._pending_lock = threading.Lock()
+        self._pending = {}
+
+        self._flights = SingleFlight()
+
+    # ---------- I/O thread ----------
+
+    def _run(self):
+        backoff = self.reconnect_delay
+
+        while not self._closing:
+            try:
+                self._connect()
+                backoff = self.reconnect_delay
+
+                while not self._closing:
+                    # Blocks until a frame or a threadsafe callback arrives.
+                    self.connection.process_data_events(time_limit=None)
+            except Exception as e:
+                if not self._closing:
+                    logger.warning(f"RPC client connection lost: {e}")
+
+            self._disconnect("RPC connection lost")
+
+            if not self._closing:
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_reconnect_delay)
+
+    def _connect(self):
+        self.connection = self.connect()
+        self.channel = self.connection.channel()
+        self.channel.basic_consume(
+            queue=DIRECT_REPLY_TO,
+            on_message_callback=self._on_response,
+            auto_ack=True,
+        )
+        self._connected.set()
+        logger.info("RPC client connected")
+
+    def _disconnect(self, reason):
+        self._connected.clear()
+        connection = self.connection
+        self.connection = None
+        self.channel = None
+
+        if connection is not None and connection.is_open:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+        # Replies for calls published on the old connection can never arrive.
+        with self._pending_lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+
+        for future in pending:
+            future.set_exception(RPCUnavailable(reason))
+
+    def _on_response(self, ch, method, props, body):
+        with self._pending_lock:
+            future = self._pending.pop(props.correlation_id, None)
+
+        if future is not None:
+            future.set_result((props.content_type, body))
+
+    def _publish(self, queue, body, corr_id, expires_at):
+        try:
+            # Nobody waits for the reply past the deadline, so neither should the request.
+            ttl = max(int((expires_at - time.time()) * 1000), 1)
+            self.channel.basic_publish(
+                exchange="",
+                routing_key=queue,
+                properties=pika.BasicProperties(
+                    reply_to=DIRECT_REPLY_TO,
+                    correlation_id=corr_id,
+                    content_type=self.content_type,
+                    expiration=str(ttl),
+                    headers={DEADLINE_HEADER: expires_at},
+                ),
+                body=body,
+            )
+        except Exception as e:
+            with self._pending_lock:
+                future = self._pending.pop(corr_id, None)
+            if future is not None:
+                future.set_exception(RPCUnavailable(f"RPC publish to {queue} failed: {e}"))
+            raise
+
+    # ---------- caller side ----------
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._closing = False
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="rpc-client-io",
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def call(self, queue, payload, timeout=5, single_flight=False):
+        """
+        Send payload to queue and return the decoded reply.
+
+        Only pass single_flight=True for idempotent lookups (token
+        validation, membership, role): identical calls made while one is
+        in flight wait for that call's reply instead of sending their own.
+        """
+        body = rpc_codec.encode(payload, self.content_type)
+
+        if single_flight:
+            content_type, response = self._flights.do(
+                (queue, body),
+                functools.partial(self._call, queue, body, timeout),
+                timeout,
+            )
+        else:
+            content_type, response = self._call(queue, body, timeout)
+
+        # Decoded per caller so callers sharing a reply never share a dict.
+        return rpc_codec.decode(response, content_type)
+
+    def _call(self, queue, body, timeout):
+        deadline = time.monotonic() + timeout
+        # Wall-clock copy of the deadline for the server, which runs elsewhere.
+        expires_at = time.time() + timeout
+        self.start()
+
+        if not self._connected.wait(timeout):
+            raise RPCUnavailable("RPC connection not available")
+
+        corr_id = str(uuid.uuid4())
+        future = Future()
+
+        with self._pending_lock:
+            self._pending[corr_id] = future
+
+        try:
+            connection = self.connection
+            if connection is None:
+                raise RPCUnavailable("RPC connection not available")
+            connection.add_callback_threadsafe(
+                functools.partial(self._publish, queue, body, corr_id, expires_at)
+            )
+        except (AMQPError, RPCUnavailable) as e:
+            with self._pending_lock:
+                self._pending.pop(corr_id, None)
+            raise RPCUnavailable(f"RPC publish to {queue} failed: {e}")
+
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeout:
+            with self._pending_lock:
+                self._pending.pop(corr_id, None)
+            raise RPCTimeout(f"RPC call to {queue} timed out")
+
+    def close(self):
+        self._closing = True
+
+        connection = self.connection
+        if connection is not None:
+            try:
+                # Wake the I/O thread so it notices it should stop.
+                connection.add_callback_threadsafe(lambda: None)
+            except AMQPError:
+                pass
+
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time.
+
+    The first caller for a key runs fn(); callers arriving with the same
+    key before it finishes get its result (or exception) instead of
+    running fn() themselves.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, timeout=5):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if leader:
+            try:
+                future.set_result(fn())
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            raise RPCTimeout("Shared RPC call timed out")
+
+
+class CallBatcher:
+    """
+    Coalesces concurrent single-item calls into one batched call.
+
+    The first caller to arrive waits `window` seconds for others to join,
+    then runs `flush(items, timeout)`, which must return one result per
+    item in order. Duplicate items in a batch are flushed once and share
+    the result. A batch that reaches `max_size` is flushed at once.
+    """
+
+    def __init__(self, flush, window=0.002, max_size=100):
+        self.flush = flush
+        self.window = window
+        self.max_size = max_size
+
+        self._lock = threading.Lock()
+        self._batch = []
+
+    def submit(self, item, timeout=5):
+        future = Future()
+
+        with self._lock:
+            batch = self._batch
+            batch.append((item, future))
+            leader = len(batch) == 1
+            full = len(batch) >= self.max_size
+            if full:
+                self._batch = []
+
+        if full:
+            self._run(batch, timeout)
+        elif leader:
+            time.sleep(self.window)
+            with self._lock:
+                # Already flushed if it filled up while we slept.
+                if self._batch is batch:
+                    self._batch = []
+                else:
+                    batch = None
+            if batch is not None:
+                self._run(batch, timeout)
+
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            raise RPCTimeout("Batched RPC call timed out")
+
+    def _run(self, batch, timeout):
+        items = list(dict.fromkeys(item for item, _ in batch))
+
+        try:
+            results = list(self.flush(items, timeout))
+            if len(results) != len(items):
+                raise RPCError(f"Batched call returned {len(results)} results for {len(items)} items")
+            results = dict(zip(items, results))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for item, future in batch:
+            future.set_result(results[item])
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_rpc_client():
+    """Return the RPC client shared by every thread in this process."""
+    global _client, _client_pid
+
+    from django.conf import settings
+
+    with _client_lock:
+        # A forked worker must not reuse its parent's socket or I/O thread.
+        if _client is None or _client_pid != os.getpid():
+            _client = RPCClient(
+                pika.ConnectionParameters(
+                    host=settings.RABBITMQ_HOST,
+                    port=settings.RABBITMQ_PORT,
+                    virtual_host=settings.RABBITMQ_VHOST,
+                    credentials=pika.PlainCredentials(
+                        settings.RABBITMQ_USER,
+                        settings.RABBITMQ_PASS,
+                    ),
+                    heartbeat=60,
+                    blocked_connection_timeout=30,
+                ),
+                content_type=rpc_codec.content_type_for(getattr(settings, "RPC_CODEC", "json")),
+            )
+            _client_pid = os.getpid()
+
+        return _client
@@ -1,3 +1,6 @@
+import functools
+import json
+import logging
 import os
 import sys
 
@@ -9,81 +12,213 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "team_service.settings")
 import django
 django.setup()
 
-import json
-import pika
 from django.conf import settings
-from django.db import close_old_connections
+from django.db.models import Q
+from teams.membership_cache import membership_cache
 from teams.models import TeamMember
+from teams.profile_sync import ProfileSync
+from teams.rpc_runtime import RPCServer
+
+logger = logging.getLogger("team_rpc")
+
+
+server = RPCServer(
+    "team_rpc",
+    workers=settings.TEAM_RPC_WORKERS,
+    prefetch=settings.TEAM_RPC_PREFETCH,
+)
+server.listen(settings.TEAM_RPC_QUEUE)
+
+profile_sync = ProfileSync(
+    delay=settings.TEAM_PROFILE_SYNC_DELAY,
+    max_attempts=settings.TEAM_PROFILE_SYNC_MAX_ATTEMPTS,
+)
+
+
+def lookup_roles(pairs):
+    """
+    Roles for (user_id, team_id) pairs, None for non-members.
+
+    Cached pairs are answered from Redis; the rest are loaded with one
+    query, filter(team_id=..., user_id__in=...) OR-ed across teams.
+    """
+    pairs = [(int(user_id), int(team_id)) for user_id, team_id in pairs]
+    roles = membership_cache.get_many(pairs)
+
+    missing = {}
+    for user_id, team_id in pairs:
+        if (user_id, team_id) not in roles:
+            missing.setdefault(team_id, set()).add(user_id)
+
+    if missing:
+        query = Q()
+        for team_id, user_ids in missing.items():
+            query |= Q(team_id=team_id, user_id__in=user_ids)
+
+        members = {
+            (m.user_id, m.team_id): m.role
+            for m in TeamMember.objects.filter(query).only("user_id", "team_id", "role")
+        }
+        fetched = {
+            (user_id, team_id): members.get((user_id, team_id))
+            for team_id, user_ids in missing.items()
+            for user_id in user_ids
+        }
+        membership_cache.fill_many(fetched)
+        roles.update(fetched)
+
+    return [roles[pair] for pair in pairs]
+
+
+def membership(role):
+    return {
+        "ok": True,
+        "is_member": role is not None,
+        "role": role,
+    }
+
+
+@server.default
+@server.action("get_membership")
+def get_membership(payload):
+    [role] = lookup_roles([(payload["user_id"], payload["team_id"])])
+    return membership(role)
+
+
+@server.action("get_memberships")
+def get_memberships(payload):
+    """
+    Answer many membership checks at once. The payload carries either
+    "pairs": [[user_id, team_id], ...] or one "team_id" with "user_ids";
+    results come back in the same order.
+    """
+    if "pairs" in payload:
+        pairs = payload["pairs"]
+    else:
+        pairs = [(user_id, payload["team_id"]) for user_id in payload["user_ids"]]
+
+    return {
+        "ok": True,
+        "results": [membership(role) for role in lookup_roles(pairs)],
+    }
+
+
+@server.action("get_member_profiles")
+def get_member_profiles(payload):
+    """
+    Names, emails and avatars of the given users as members of one team,
+    in one query. Users who aren't members are left out.
+    """
+    members = TeamMember.objects.filter(
+        team_id=int(payload["team_id"]),
+        user_id__in=[int(user_id) for user_id in payload["user_ids"]],
+    ).values_list("user_id", "user_name", "user_email", "avatar_url")
+
+    return {
+        "ok": True,
+        "profiles": [
+            [user_id, {"name": name, "email": email, "avatar_url": avatar_url}]
+            for user_id, name, email, avatar_url in members
+        ],
+    }
+
+
+@server.action("get_user_memberships")
+def get_user_memberships(payload):
+    """
+    Every (team_id, role) of a user with a version stamp. A caller that
+    sends the stamp it already holds gets {"unchanged": true} instead.
+    """
+    user_id = int(payload["user_id"])
+
+    # Read before the query, so the data is never older than the stamp.
+    version = membership_cache.user_version(user_id)
+    if version is not None and payload.get("version") == version:
+        return {"ok": True, "unchanged": True, "version": version}
+
+    memberships = TeamMember.objects.filter(user_id=user_id).values_list("team_id", "role")
+    return {
+        "ok": True,
+        "version": version,
+        "memberships": [[team_id, role] for team_id, role in memberships],
+    }
+
+
+def _settle(ch, delivery_tag, ok):
+    # Called from the sync thread; acks have to go out on the connection's own.
+    def settle():
+        if ok:
+            ch.basic_ack(delivery_tag)
+        else:
+            ch.basic_nack(delivery_tag, requeue=True)
+
+    try:
+        ch.connection.add_callback_threadsafe(settle)
+    except Exception as e:
+        # The connection is gone; the broker redelivers the event.
+        logger.warning(f"Could not settle profile event: {e}")
+
+
+def on_user_event(ch, method, props, body):
+    try:
+        payload = json.loads(body.decode())
+        profile = payload.get("profile")
+        if payload.get("event") == "user_updated" and profile:
+            profile_sync.add(
+                int(payload["user_id"]),
+                payload["updated_at"],
+                profile,
+                settle=functools.partial(_settle, ch, method.delivery_tag),
+            )
+            return
+    except Exception as e:
+        logger.error(f"Invalid user event: {e}")
+
+    ch.basic_ack(method.delivery_tag)
+
+
+@server.on_connect
+def subscribe_profile_events(channel):
+    # A durable queue, so edits made while this worker is down are
+    # applied when it comes back.
+    channel.exchange_declare(
+        exchange=settings.AUTH_USER_EVENTS_EXCHANGE,
+        exchange_type="fanout",
+        durable=True,
+    )
+    channel.queue_declare(queue=settings.TEAM_PROFILE_EVENTS_QUEUE, durable=True)
+    channel.queue_bind(
+        queue=settings.TEAM_PROFILE_EVENTS_QUEUE,
+        exchange=settings.AUTH_USER_EVENTS_EXCHANGE,
+    )
+    return channel.basic_consume(
+        queue=settings.TEAM_PROFILE_EVENTS_QUEUE,
+        on_message_callback=on_user_event,
+    )
 
 
-def run_team_rpc():
-    connection = pika.BlockingConnection(
-        pika.ConnectionParameters(
-            host=settings.RABBITMQ_HOST,
-            port=settings.RABBITMQ_PORT,
-            virtual_host=settings.RABBITMQ_VHOST,
-            credentials=pika.PlainCredentials(
-                settings.RABBITMQ_USER,
-                settings.RABBITMQ_PASS,
-            ),
-        )
+@server.reporter
+def report_profile_sync():
+    stats = profile_sync.stats()
+    logger.info(
+        f"profile_sync pending={stats['pending']} users_applied={stats['applied']} "
+        f"rows_updated={stats['rows']} dropped={stats['dropped']}"
     )
 
-    channel = connection.channel()
-    channel.queue_declare(queue=settings.TEAM_RPC_QUEUE, durable=True)
-    channel.basic_qos(prefetch_count=1)
-
-    print("Team RPC Server started. Waiting for requests...")
-
-    def on_request(ch, method, props, body):
-        close_old_connections()
-
-        try:
-            payload = json.loads(body.decode())
-            user_id = payload["user_id"]
-            team_id = payload["team_id"]
-
-            member = TeamMember.objects.filter(
-                user_id=user_id,
-                team_id=team_id
-            ).first()
-
-            if not member:
-                response = {
-                    "ok": True,
-                    "is_member": False,
-                    "role": None,
-                }
-            else:
-                response = {
-                    "ok": True,
-                    "is_member": True,
-                    "role": member.role,
-                }
-
-        except Exception as e:
-            response = {"ok": False, "error": str(e)}
-
-        ch.basic_publish(
-            exchange="",
-            routing_key=props.reply_to,
-            properties=pika.BasicProperties(
-                correlation_id=props.correlation_id
-            ),
-            body=json.dumps(response),
-        )
-        ch.basic_ack(method.delivery_tag)
-
-    channel.basic_consume(
-        queue=settings.TEAM_RPC_QUEUE,
-        on_message_callback=on_request,
+
+@server.reporter
+def report_membership_cache():
+    cache = membership_cache.stats()
+    logger.info(
+        f"membership_cache hits={cache['hits']} misses={cache['misses']} "
+        f"hit_ratio={cache['hit_ratio']:.2f}"
     )
 
-    try:
-        channel.start_consuming()
-    finally:
-        connection.close()
-        
+
 if __name__ == "__main__":
     print("TEAM Server starting...")
-    run_team_rpc()
+    profile_sync.start()
+    try:
+        server.run()
+    finally:
+        profile_sync.stop()
@@ -0,0 +1,126 @@
+import heapq
+import re
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+
+from .models import TeamMember
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+SEARCH_FIELDS = ("id", "user_id", "user_name", "user_email", "avatar_url", "role")
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def trigrams(text):
+    """Trigrams the way pg_trgm makes them: lowercased words padded with two spaces in front, one behind."""
+    grams = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _similarity(a, b):
+    """pg_trgm similarity() of two trigram sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MemberIndex:
+    """
+    In-memory substring index over members' names and emails.
+
+    Stands in for the pg_trgm indexes where they don't exist (SQLite in
+    tests and benchmarks). Like the icontains filters in search_members it
+    matches substrings at any length: rows are posted under every 1-, 2-
+    and 3-character slice, a query intersects the posting lists of its
+    longest slices, and candidates are confirmed with a substring check.
+    Results are ranked like the Postgres query: prefix matches first,
+    then by trigram similarity.
+
+    search_members builds one per request, which is fine for the small
+    teams of tests and local runs; keep an instance around to serve
+    repeated queries.
+    """
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self._keys = []  # per row: (name, email), lowercased
+        self._postings = defaultdict(set)
+
+        for i, row in enumerate(self.rows):
+            name, email = row["user_name"].lower(), row["user_email"].lower()
+            self._keys.append((name, email))
+
+            text = f"{name}\n{email}"
+            for n in (1, 2, 3):
+                for j in range(len(text) - n + 1):
+                    self._postings[text[j:j + n]].add(i)
+
+    def _candidates(self, q):
+        n = min(len(q), 3)
+        grams = {q[j:j + n] for j in range(len(q) - n + 1)}
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        return set.intersection(*postings)
+
+    def search(self, q, limit=DEFAULT_LIMIT):
+        q = q.strip().lower()
+        if not q:
+            return []
+
+        q_grams = trigrams(q)
+
+        def rank(i):
+            name, email = self._keys[i]
+            prefix = name.startswith(q) or email.startswith(q)
+            score = max(_similarity(q_grams, trigrams(name)), _similarity(q_grams, trigrams(email)))
+            return (0 if prefix else 1, -score, name, self.rows[i]["id"])
+
+        matches = [
+            i for i in self._candidates(q)
+            if q in self._keys[i][0] or q in self._keys[i][1]
+        ]
+        return [self.rows[i] for i in heapq.nsmallest(limit, matches, key=rank)]
+
+
+def search_members(team, q, limit=DEFAULT_LIMIT):
+    """
+    Top `limit` members of the team whose name or email contains `q`.
+
+    On Postgres the icontains filters are served by the trigram indexes
+    from migration 0006 and the ranking runs in the database. Other
+    backends build a MemberIndex over the team's rows.
+    """
+    members = TeamMember.objects.filter(team=team)
+
+    if connection.vendor != "postgresql":
+        return MemberIndex(members.values(*SEARCH_FIELDS)).search(q, limit)
+
+    from django.contrib.postgres.search import TrigramSimilarity
+
+    q = q.strip()
+    if not q:
+        return []
+
+    return list(
+        members.filter(Q(user_name__icontains=q) | Q(user_email__icontains=q))
+        .annotate(
+            prefix=Case(
+                When(Q(user_name__istartswith=q) | Q(user_email__istartswith=q), then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            ),
+            score=Greatest(
+                TrigramSimilarity("user_name", q),
+                TrigramSimilarity("user_email", q),
+            ),
+        )
+        .order_by("prefix", "-score", "user_name", "id")
+        .values(*SEARCH_FIELDS)[:limit]
+    )
@@ -1,11 +1,11 @@
 from rest_framework import serializers
-from .models import Team, TeamMember
+from .models import Invitation, Team, TeamMember
 
 class TeamSerializer(serializers.ModelSerializer):
     class Meta:
         model = Team
-        fields = ["id", "name", "code", "created_by", "created_at"]
-        read_only_fields = ["id", "code", "created_by", "created_at"]
+        fields = ["id", "name", "code", "created_by", "created_at", "member_count", "manager_count"]
+        read_only_fields = ["id", "code", "created_by", "created_at", "member_count", "manager_count"]
 
 
 class TeamMemberSerializer(serializers.ModelSerializer):
@@ -21,4 +21,9 @@ class TeamMemberSerializer(serializers.ModelSerializer):
             "role",
             "joined_at",
         ]
-        read_only_fields = ["id", "joined_at", "team", "user_id"]
\ No newline at end of file
+        read_only_fields = ["id", "joined_at", "team", "user_id"]
+
+class InvitationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Invitation
+        fields = ["id", "email", "status", "error", "created_at", "sent_at"]
@@ -0,0 +1,68 @@
+import logging
+
+from celery import shared_task
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import Invitation
+
+logger = logging.getLogger("invitations")
+
+INVITE_FROM_EMAIL = "no-reply@synq.com"
+
+
+def invitation_message(invitation, connection):
+    team = invitation.team
+    return EmailMessage(
+        f"You are invited to join team: {team.name}",
+        (
+            f"You have been invited to join team '{team.name}'.\n\n"
+            f"Use this invite code:\n{team.code}"
+        ),
+        INVITE_FROM_EMAIL,
+        [invitation.email],
+        connection=connection,
+    )
+
+
+@shared_task
+def send_invitations(invitation_ids):
+    """
+    Deliver a batch of pending invitations over one mail connection.
+
+    Messages are still sent one at a time so a rejected recipient only
+    fails its own invitation; each row ends up "sent" or "failed" with
+    the error that stopped it.
+    """
+    invitations = list(
+        Invitation.objects.filter(
+            id__in=invitation_ids,
+            status=Invitation.STATUS_PENDING,
+        ).select_related("team")
+    )
+    if not invitations:
+        return
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        logger.warning(f"Could not open mail connection for {len(invitations)} invitations: {e}")
+        for invitation in invitations:
+            invitation.status = Invitation.STATUS_FAILED
+            invitation.error = str(e)[:255]
+    else:
+        try:
+            for invitation in invitations:
+                try:
+                    connection.send_messages([invitation_message(invitation, connection)])
+                except Exception as e:
+                    invitation.status = Invitation.STATUS_FAILED
+                    invitation.error = str(e)[:255]
+                else:
+                    invitation.status = Invitation.STATUS_SENT
+                    invitation.sent_at = timezone.now()
+        finally:
+            connection.close()
+
+    Invitation.objects.bulk_update(invitations, ["status", "error", "sent_at"])
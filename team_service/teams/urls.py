@@ -1,6 +1,8 @@
 from django.urls import path
 from .views import (
     CreateTeamView, JoinTeamView, MyTeamsView, TeamMembersView, RemoveMemberView,LeaveTeamView,InviteMemberView,MyRoleInTeamView,
+    BulkInviteView, InviteBatchView, ChangeRoleView,
+    TeamMemberSearchView, ImportMembersView,
 )
 
 urlpatterns = [
@@ -8,9 +10,14 @@ urlpatterns = [
     path("teams/join/", JoinTeamView.as_view(), name="join-team"),
     path("teams/my/", MyTeamsView.as_view(), name="my-teams"),
     path("teams/<int:team_id>/members/", TeamMembersView.as_view(), name="team-members"),
+    path("teams/<int:team_id>/members/search/", TeamMemberSearchView.as_view(), name="team-member-search"),
+    path("teams/<int:team_id>/members/import/", ImportMembersView.as_view(), name="import-members"),
     path("teams/<int:team_id>/members/remove/", RemoveMemberView.as_view(), name="remove-member"),
+    path("teams/<int:team_id>/members/role/", ChangeRoleView.as_view(), name="change-role"),
     path("<int:team_id>/leave/", LeaveTeamView.as_view(), name="leave-team"),
     path("teams/<int:team_id>/invite/", InviteMemberView.as_view(), name="invite-member"),
+    path("teams/<int:team_id>/invite/bulk/", BulkInviteView.as_view(), name="bulk-invite"),
+    path("teams/<int:team_id>/invites/<uuid:batch>/", InviteBatchView.as_view(), name="invite-batch"),
     path("teams/<int:team_id>/me/role/",MyRoleInTeamView.as_view()),
 
 ]
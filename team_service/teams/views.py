@@ -3,11 +3,18 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-from django.core.paginator import Paginator, EmptyPage
-from django.core.mail import send_mail
-
-from .models import Team, TeamMember
-from .serializers import TeamSerializer, TeamMemberSerializer
+from django.conf import settings
+from django.db import transaction
+
+from .counters import member_added, member_removed, role_changed
+from .etags import make_etag, not_modified, query_key, request_etags
+from .invitations import queue_invitations
+from .member_import import MemberImport, MemberImportFailed, detect_format, read_rows
+from .membership_cache import membership_cache
+from .models import Invitation, Team, TeamMember
+from .pagination import InvalidPage, cached_count, paginate_members, wants_count
+from .search import DEFAULT_LIMIT, MAX_LIMIT, search_members
+from .serializers import InvitationSerializer, TeamSerializer, TeamMemberSerializer
 from .permissions import IsAuthenticatedByAuthService
 
 
@@ -29,19 +36,23 @@ class CreateTeamView(APIView):
         if not name:
             return Response({"detail": "Team name required"}, status=400)
 
-        team = Team.objects.create(
-            name=name,
-            code=secrets.token_hex(4),
-            created_by=user["id"],
-        )
+        with transaction.atomic():
+            team = Team.objects.create(
+                name=name,
+                code=secrets.token_hex(4),
+                created_by=user["id"],
+                member_count=1,
+                manager_count=1,
+            )
 
-        TeamMember.objects.create(
-            team=team,
-            user_id=user["id"],
-            user_name=user.get("full_name", ""),
-            user_email=user.get("email", ""),
-            role=TeamMember.ROLE_MANAGER,
-        )
+            TeamMember.objects.create(
+                team=team,
+                user_id=user["id"],
+                user_name=user.get("full_name", ""),
+                user_email=user.get("email", ""),
+                role=TeamMember.ROLE_MANAGER,
+            )
+        membership_cache.update(team.id, user["id"], TeamMember.ROLE_MANAGER)
 
         return Response(TeamSerializer(team).data, status=201)
 
@@ -61,43 +72,79 @@ class JoinTeamView(APIView):
         if TeamMember.objects.filter(team=team, user_id=user["id"]).exists():
             return Response({"detail": "Already a member"}, status=200)
 
-        TeamMember.objects.create(
-            team=team,
-            user_id=user["id"],
-            user_name=user.get("full_name", ""),
-            user_email=user.get("email", ""),
-            role=TeamMember.ROLE_MEMBER,
-        )
+        with transaction.atomic():
+            TeamMember.objects.create(
+                team=team,
+                user_id=user["id"],
+                user_name=user.get("full_name", ""),
+                user_email=user.get("email", ""),
+                role=TeamMember.ROLE_MEMBER,
+            )
+            member_added(team.id, TeamMember.ROLE_MEMBER)
+        membership_cache.update(team.id, user["id"], TeamMember.ROLE_MEMBER)
 
         return Response({"detail": "Joined successfully"}, status=201)
 
 
+# Query parameters that change what a list page contains.
+LIST_PARAMS = ("cursor", "per_page", "count")
+
+
 class MyTeamsView(APIView):
     permission_classes = [IsAuthenticatedByAuthService]
 
     def get(self, request):
         user = request.auth_user
+        params = query_key(request.query_params, LIST_PARAMS)
+
+        # The page depends on the user's memberships (user version) and on
+        # each listed team's fields and counts (team versions). The ETag
+        # covers all of them; the listed team ids are kept in Redis under
+        # the ETag so a revalidation needs no query.
+        user_version = membership_cache.user_version(user["id"])
+        if user_version is not None:
+            for etag in request_etags(request):
+                data = membership_cache.etag_data(etag)
+                if data is None:
+                    continue
+                versions = membership_cache.team_versions(data["teams"])
+                if versions is not None and etag == make_etag(
+                    "my-teams", user["id"], user_version, params, data["teams"], versions
+                ):
+                    return not_modified(etag)
+
+        memberships = TeamMember.objects.filter(user_id=user["id"])
 
-        memberships = TeamMember.objects.filter(
-            user_id=user["id"]
-        ).select_related("team")
-
-        teams = [m.team for m in memberships]
-
-        page = int(request.query_params.get("page", 1))
-        per_page = int(request.query_params.get("per_page", 25))
-
-        paginator = Paginator(teams, per_page)
         try:
-            page_obj = paginator.page(page)
-        except EmptyPage:
-            return Response({"detail": "Page out of range"}, status=400)
+            page, next_cursor = paginate_members(memberships, request.query_params)
+        except InvalidPage as e:
+            return Response({"detail": str(e)}, status=400)
+
+        # Teams are read after their versions, so the data is never older
+        # than the stamps in the ETag.
+        team_ids = [member.team_id for member in page]
+        versions = membership_cache.team_versions(team_ids) if user_version is not None else None
+        teams = Team.objects.in_bulk(team_ids)
+
+        data = {
+            "next_cursor": next_cursor,
+            "results": TeamSerializer(
+                [teams[team_id] for team_id in team_ids if team_id in teams],
+                many=True,
+            ).data,
+        }
+        if wants_count(request.query_params):
+            data["count"] = cached_count(
+                f"teams:my:count:{user['id']}:{user_version}",
+                memberships,
+            )
 
-        return Response({
-            "count": paginator.count,
-            "num_pages": paginator.num_pages,
-            "results": TeamSerializer(page_obj.object_list, many=True).data,
-        })
+        response = Response(data)
+        if versions is not None:
+            etag = make_etag("my-teams", user["id"], user_version, params, team_ids, versions)
+            membership_cache.remember_etag(etag, {"teams": team_ids})
+            response["ETag"] = etag
+        return response
 
 
 class InviteMemberView(APIView):
@@ -114,32 +161,63 @@ class InviteMemberView(APIView):
         if not email:
             return Response({"detail": "Email required"}, status=400)
 
-        invite_code = team.code
+        batch, results = queue_invitations(team, [email], user["id"])
+        result = results[0]
+        if result["status"] == "invalid":
+            return Response({"detail": "Invalid email"}, status=400)
+        if result["status"] == "already_member":
+            return Response({"detail": f"{result['email']} is already a member"}, status=400)
 
-        subject = f"You are invited to join team: {team.name}"
-        message = (
-          f"You have been invited to join team '{team.name}'.\n\n"
-          f"Use this invite code:\n{invite_code}"
-           )
+        # Delivery happens in the background; the batch shows how it went.
+        return Response(
+            {
+                "detail": f"Invitation queued for {result['email']}",
+                "code": team.code,
+                "batch": batch,
+                "status": result["status"],
+            },
+            status=202,
+        )
 
-        try:
-            send_mail(
-                subject,
-                message,
-                "no-reply@synq.com",
-                [email],
-                fail_silently=False,
-            )
-        except Exception as e:
+
+class BulkInviteView(APIView):
+    permission_classes = [IsAuthenticatedByAuthService]
+
+    def post(self, request, team_id):
+        user = request.auth_user
+        team = get_object_or_404(Team, id=team_id)
+
+        if not is_team_manager(user["id"], team):
+            return Response({"detail": "Only managers can invite"}, status=403)
+
+        emails = request.data.get("emails")
+        if not isinstance(emails, list) or not emails:
+            return Response({"detail": "emails must be a non-empty list"}, status=400)
+        if len(emails) > settings.INVITE_MAX_RECIPIENTS:
             return Response(
-                {"detail": "Failed to send email", "error": str(e)},
-                status=500,
+                {"detail": f"At most {settings.INVITE_MAX_RECIPIENTS} emails per request"},
+                status=400,
             )
 
-        return Response(
-            {"detail": f"Invitation sent to {email}", "code": invite_code},
-            status=200,
-        )
+        batch, results = queue_invitations(team, emails, user["id"])
+        return Response({"batch": batch, "results": results}, status=202)
+
+
+class InviteBatchView(APIView):
+    permission_classes = [IsAuthenticatedByAuthService]
+
+    def get(self, request, team_id, batch):
+        user = request.auth_user
+        team = get_object_or_404(Team, id=team_id)
+
+        if not is_team_manager(user["id"], team):
+            return Response({"detail": "Only managers can view invitations"}, status=403)
+
+        invitations = Invitation.objects.filter(team=team, batch=batch).order_by("id")
+        return Response({
+            "batch": batch,
+            "results": InvitationSerializer(invitations, many=True).data,
+        })
 
 
 class TeamMembersView(APIView):
@@ -147,27 +225,93 @@ class TeamMembersView(APIView):
 
     def get(self, request, team_id):
         user = request.auth_user
+        params = query_key(request.query_params, LIST_PARAMS)
+
+        # Revalidation only needs the team's version stamp and the caller's
+        # cached role, both in Redis.
+        team_version = membership_cache.team_version(team_id)
+        if team_version is not None:
+            etag = make_etag("team-members", team_id, team_version, params)
+            if etag in request_etags(request):
+                roles = membership_cache.get_many([(user["id"], team_id)])
+                if roles.get((user["id"], team_id)) is not None:
+                    return not_modified(etag)
+
         team = get_object_or_404(Team, id=team_id)
 
         if not TeamMember.objects.filter(team=team, user_id=user["id"]).exists():
             return Response({"detail": "Forbidden"}, status=403)
 
-        members_qs = TeamMember.objects.filter(team=team).order_by("-joined_at")
+        members_qs = TeamMember.objects.filter(team=team)
+
+        try:
+            page, next_cursor = paginate_members(members_qs, request.query_params, default_per_page=50)
+        except InvalidPage as e:
+            return Response({"detail": str(e)}, status=400)
+
+        data = {
+            "next_cursor": next_cursor,
+            "results": TeamMemberSerializer(page, many=True).data,
+        }
+        if wants_count(request.query_params):
+            data["count"] = team.member_count
 
-        page = int(request.query_params.get("page", 1))
-        per_page = int(request.query_params.get("per_page", 50))
+        response = Response(data)
+        if team_version is not None:
+            response["ETag"] = make_etag("team-members", team_id, team_version, params)
+        return response
+
+
+class TeamMemberSearchView(APIView):
+    permission_classes = [IsAuthenticatedByAuthService]
+
+    def get(self, request, team_id):
+        user = request.auth_user
+        team = get_object_or_404(Team, id=team_id)
+
+        if not TeamMember.objects.filter(team=team, user_id=user["id"]).exists():
+            return Response({"detail": "Forbidden"}, status=403)
+
+        q = request.query_params.get("q", "").strip()
+        if not q:
+            return Response({"detail": "q required"}, status=400)
 
-        paginator = Paginator(members_qs, per_page)
         try:
-            page_obj = paginator.page(page)
-        except EmptyPage:
-            return Response({"detail": "Page out of range"}, status=400)
+            limit = int(request.query_params.get("limit", DEFAULT_LIMIT))
+        except ValueError:
+            return Response({"detail": "limit must be an integer"}, status=400)
+        limit = max(1, min(limit, MAX_LIMIT))
 
-        return Response({
-            "count": paginator.count,
-            "num_pages": paginator.num_pages,
-            "results": TeamMemberSerializer(page_obj.object_list, many=True).data,
-        })
+        return Response({"results": search_members(team, q, limit)})
+
+
+class ImportMembersView(APIView):
+    permission_classes = [IsAuthenticatedByAuthService]
+
+    def post(self, request, team_id):
+        user = request.auth_user
+        team = get_object_or_404(Team, id=team_id)
+
+        if not is_team_manager(user["id"], team):
+            return Response({"detail": "Only managers can import members"}, status=403)
+
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"detail": "file required"}, status=400)
+
+        fmt = detect_format(upload.name, request.data.get("format"))
+        if fmt is None:
+            return Response({"detail": "format must be csv or ndjson"}, status=400)
+
+        importer = MemberImport(team, batch_size=settings.MEMBER_IMPORT_BATCH_SIZE)
+        try:
+            summary = importer.run(read_rows(upload, fmt))
+        except MemberImportFailed as e:
+            return Response({"detail": str(e), **e.summary}, status=502)
+        except UnicodeDecodeError:
+            return Response({"detail": "file must be UTF-8", **importer.summary}, status=400)
+
+        return Response(summary)
 
 
 class RemoveMemberView(APIView):
@@ -200,7 +344,11 @@ class RemoveMemberView(APIView):
         if not member:
             return Response({"detail": "Member not found"}, status=404)
 
-        member.delete()
+        with transaction.atomic():
+            deleted, _ = TeamMember.objects.filter(id=member.id).delete()
+            if deleted:
+                member_removed(team.id, member.role)
+        membership_cache.update(team.id, target_user_id, None)
         return Response({"detail": "Member removed"}, status=200)
 
 
@@ -219,22 +367,63 @@ class LeaveTeamView(APIView):
         if not membership:
             return Response({"detail": "You are not a member"}, status=403)
 
-        if membership.role == TeamMember.ROLE_MANAGER:
-            manager_count = TeamMember.objects.filter(
-                team=team,
-                role=TeamMember.ROLE_MANAGER
-            ).count()
+        with transaction.atomic():
+            deleted, _ = TeamMember.objects.filter(id=membership.id).delete()
+            if not deleted:
+                return Response({"detail": "You are not a member"}, status=403)
 
-            if manager_count == 1:
+            if not member_removed(team.id, membership.role, keep_manager=True):
+                transaction.set_rollback(True)
                 return Response(
                     {"detail": "You are the only manager. Transfer management first."},
                     status=400,
                 )
 
-        membership.delete()
+        membership_cache.update(team.id, user["id"], None)
         return Response({"detail": "Left team successfully"}, status=200)
 
 
+class ChangeRoleView(APIView):
+    permission_classes = [IsAuthenticatedByAuthService]
+
+    def post(self, request, team_id):
+        user = request.auth_user
+        team = get_object_or_404(Team, id=team_id)
+
+        if not is_team_manager(user["id"], team):
+            return Response({"detail": "Only managers can change roles"}, status=403)
+
+        role = request.data.get("role")
+        if role not in (TeamMember.ROLE_MANAGER, TeamMember.ROLE_MEMBER):
+            return Response({"detail": "role must be manager or member"}, status=400)
+
+        try:
+            target_user_id = int(request.data.get("user_id"))
+        except (TypeError, ValueError):
+            return Response({"detail": "user_id must be integer"}, status=400)
+
+        with transaction.atomic():
+            member = (
+                TeamMember.objects.select_for_update()
+                .filter(team=team, user_id=target_user_id)
+                .first()
+            )
+            if not member:
+                return Response({"detail": "Member not found"}, status=404)
+
+            if not role_changed(team.id, member.role, role, keep_manager=True):
+                return Response(
+                    {"detail": "A team needs at least one manager."},
+                    status=400,
+                )
+
+            member.role = role
+            member.save(update_fields=["role"])
+
+        membership_cache.update(team.id, target_user_id, role)
+        return Response(TeamMemberSerializer(member).data)
+
+
 class MyRoleInTeamView(APIView):
     permission_classes = [IsAuthenticatedByAuthService]
 